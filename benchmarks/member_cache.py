@@ -0,0 +1,156 @@
+"""Resident memory and startup cost of the member cache policies on a synthetic 50k member guild.
+
+The guild is built from fake gateway payloads parsed by discord.py, the way main.py configures it for each policy.
+Each policy runs in its own process so resident memory isn't shared between them.
+
+Run from the repository root: python -m benchmarks.member_cache
+"""
+import json
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import discord
+from discord.state import ChunkRequest, ConnectionState
+
+GUILD_ID = 10**17
+MEMBERS = 50_000
+LINKED = 2_000
+CHUNK_SIZE = 1000  # Members per GUILD_MEMBERS_CHUNK when chunking the guild
+QUERY_SIZE = 100  # Members per query_members request, as MemberCache.keep sends them
+ONLINE = 0.2  # Share of members with a presence in their chunk
+
+
+def member_payload(number: int, rng: random.Random) -> dict:
+    return {
+        "user": {
+            "id": str(GUILD_ID + number + 1),
+            "username": f"member_{number}",
+            "global_name": f"Member {number}",
+            "discriminator": "0",
+            "avatar": f"{rng.getrandbits(128):032x}",
+        },
+        "nick": f"nick_{number}" if rng.random() < 0.3 else None,
+        "roles": [str(GUILD_ID + MEMBERS + 1 + role) for role in rng.sample(range(50), 3)],
+        "joined_at": "2023-01-01T00:00:00+00:00",
+        "deaf": False,
+        "mute": False,
+        "flags": 0,
+    }
+
+
+def presence_payload(member: dict) -> dict:
+    return {
+        "user": {"id": member["user"]["id"]},
+        "status": "online",
+        "client_status": {"desktop": "online"},
+        "activities": [{"name": "Minecraft", "type": 0, "created_at": 0}],
+    }
+
+
+def guild_payload() -> dict:
+    roles = [
+        {"id": str(GUILD_ID + MEMBERS + 1 + role), "name": f"role_{role}", "permissions": "0", "position": role}
+        for role in range(50)
+    ]
+    roles.append({"id": str(GUILD_ID), "name": "@everyone", "permissions": "0", "position": 0})
+    return {"id": str(GUILD_ID), "name": "guild", "member_count": MEMBERS, "large": True, "roles": roles}
+
+
+def connection_state(policy: str) -> ConnectionState:
+    """A connection state with the intents and member cache flags main.py uses for the policy."""
+    linked_only = policy == "linked"
+    intents = discord.Intents.all()
+    intents.presences = not linked_only
+    return ConnectionState(
+        dispatch=lambda *args, **kwargs: None,
+        handlers={},
+        hooks={},
+        http=None,
+        intents=intents,
+        chunk_guilds_at_startup=not linked_only,
+        member_cache_flags=discord.MemberCacheFlags.none() if linked_only else None,
+    )
+
+
+def receive(state: ConnectionState, members: list[dict], chunk_size: int, presences: bool) -> int:
+    """Parses the member chunks answering one chunk request, returning the bytes received from the gateway."""
+    request = ChunkRequest(GUILD_ID, 0, None, state._get_guild, cache=True)
+    state._chunk_requests[request.nonce] = request
+    received = 0
+    chunks = range(0, len(members), chunk_size)
+    for index, start in enumerate(chunks):
+        chunk = members[start : start + chunk_size]
+        payload = {
+            "guild_id": str(GUILD_ID),
+            "members": chunk,
+            "chunk_index": index,
+            "chunk_count": len(chunks),
+            "nonce": request.nonce,
+        }
+        if presences:
+            payload["presences"] = [presence_payload(member) for member in chunk[:: round(1 / ONLINE)]]
+        # The gateway sends json text, decoding it is part of the startup cost
+        text = json.dumps(payload)
+        received += len(text)
+        state.parse_guild_members_chunk(json.loads(text))
+    return received
+
+
+def resident_memory() -> int:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * 4096
+
+
+def build(policy: str, members: list[dict], linked: list[dict]) -> tuple[ConnectionState, discord.Guild, int]:
+    """Fills the member cache the way the policy does at startup."""
+    state = connection_state(policy)
+    guild = discord.Guild(data=guild_payload(), state=state)
+    state._add_guild(guild)
+    if policy == "full":
+        received = receive(state, members, CHUNK_SIZE, presences=True)
+    else:
+        received = receive(state, linked, QUERY_SIZE, presences=False)
+    return state, guild, received
+
+
+def measure(policy: str) -> dict:
+    """Memory held by the cache and time spent filling it at startup, for one policy."""
+    rng = random.Random(MEMBERS)
+    members = [member_payload(number, rng) for number in range(MEMBERS)]
+    # Linked players are the members the bot syncs, spread through the guild
+    linked = rng.sample(members, LINKED)
+    # Timed and resident memory measured without tracemalloc, which slows allocations down and adds its own memory
+    rss = resident_memory()
+    start = time.perf_counter()
+    state, guild, received = build(policy, members, linked)
+    elapsed = time.perf_counter() - start
+    rss = resident_memory() - rss
+    result = {"policy": policy, "cached": len(guild.members), "users": len(state._users)}
+    del state, guild
+    tracemalloc.start()
+    kept = build(policy, members, linked)
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return dict(result, seconds=elapsed, allocated=allocated, rss=rss, received=received)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        print(json.dumps(measure(sys.argv[1])))
+        sys.exit()
+    print(f"{MEMBERS} members, {LINKED} linked players")
+    print(f"{'policy':>7} {'cached':>7} {'users':>7} {'startup':>9} {'allocated':>10} {'rss':>10} {'received':>10}")
+    for policy in ("full", "linked"):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.member_cache", policy], capture_output=True, check=True, text=True
+        ).stdout
+        result = json.loads(output)
+        print(
+            f"{policy:>7} {result['cached']:>7} {result['users']:>7} {result['seconds'] * 1000:>6.0f} ms"
+            f" {result['allocated'] / 2**20:>6.1f} MiB {result['rss'] / 2**20:>6.1f} MiB"
+            f" {result['received'] / 2**20:>6.1f} MiB"
+        )
@@ -0,0 +1,88 @@
+"""Time to build a 1k player snapshot and 1k crew members, validated by pydantic and through the trusted path.
+
+Run from the repository root: python -m benchmarks.player_construction
+"""
+import random
+import timeit
+from datetime import datetime
+
+from utils import objects
+from utils.converters import get_uuid_from_parts
+from utils.objects import Crew, DevilFruit, PlayerData
+
+PLAYERS = 1_000
+CREW_SIZE = 10
+FRUITS = [
+    DevilFruit(name=f"fruit_{i}_no_mi", format_name=f"Fruit {i}", qualified_name=f"fruit_{i}", rarity="wooden_box")
+    for i in range(20)
+]
+
+
+def synthetic_values(rng: random.Random) -> list[dict]:
+    """The values Tasks.build_player passes for each player."""
+    return [
+        dict(
+            uuid=get_uuid_from_parts(rng.getrandbits(63), rng.getrandbits(63)),
+            name=f"player_{number}",
+            race=rng.choice(["human", "cyborg", "mink", "fishman"]),
+            sub_race=None,
+            faction=rng.choice(["pirate", "marine", "revolutionary", "bounty_hunter"]),
+            fighting_style=rng.choice(["brawler", "swordsman", "black_leg", "sniper", "doctor", "art_of_weather"]),
+            inventory={f"minecraft:item_{i}": rng.randint(1, 64) for i in rng.sample(range(200), 20)},
+            devil_fruits=rng.sample(FRUITS, 2),
+            eaten_devil_fruits=rng.sample(FRUITS, 1),
+            inventory_devil_fruits=rng.sample(FRUITS, 1),
+            belly=rng.randint(0, 10**6),
+            bounty=rng.randint(0, 10**6),
+            loyalty=rng.randint(0, 100),
+            doriki=rng.randint(0, 10**4),
+            harderning_haki=rng.random() * 100,
+            imbuing_haki=rng.random() * 100,
+            observation_haki=rng.random() * 100,
+            haoshoku_haki=False,
+            haki_limit=2200.0,
+            mob_kills={f"minecraft:mob_{i}": rng.randint(1, 500) for i in rng.sample(range(60), 15)},
+            discord_id=rng.choice([None, rng.getrandbits(60)]),
+            last_seen=datetime.utcnow(),
+            inactive=False,
+        )
+        for number in range(PLAYERS)
+    ]
+
+
+def synthetic_crews(rng: random.Random) -> list[dict]:
+    """Crew compounds of mineminenomi.dat, the same players showing up every time it is read."""
+    return [
+        {
+            "name": f"crew_{number}",
+            "jollyRoger": {},
+            "members": [
+                {"username": f"player_{i}", "isCaptain": int(i == 0), "idMost": rng.getrandbits(63), "idLeast": i}
+                for i in range(CREW_SIZE)
+            ],
+        }
+        for number in range(PLAYERS // CREW_SIZE)
+    ]
+
+
+def validated(values: list[dict], crews: list[dict]):
+    # Without the uuid memoisation, like before
+    objects.get_uuid_from_parts = get_uuid_from_parts.__wrapped__
+    try:
+        [PlayerData(**player) for player in values]
+        [Crew(**crew) for crew in crews]
+    finally:
+        objects.get_uuid_from_parts = get_uuid_from_parts
+
+
+def trusted(values: list[dict], crews: list[dict]):
+    [PlayerData.trusted(**player) for player in values]
+    [Crew.trusted(**crew) for crew in crews]
+
+
+if __name__ == "__main__":
+    rng = random.Random(0)
+    values, crews = synthetic_values(rng), synthetic_crews(rng)
+    for name, build in (("validated", validated), ("trusted", trusted)):
+        best = min(timeit.repeat(lambda: build(values, crews), number=1, repeat=20))
+        print(f"{name:>10}: {best * 1000:.2f} ms for {PLAYERS} players and {PLAYERS} crew members")
@@ -0,0 +1,89 @@
+"""Per player memory of the player data snapshot, with full inventories and with item count summaries.
+
+Run from the repository root: python -m benchmarks.player_memory
+"""
+import json
+import random
+import sys
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+from utils.objects import PlayerData
+
+ITEMS = [f"minecraft:item_{i}" for i in range(200)]
+MOBS = [f"minecraft:mob_{i}" for i in range(60)]
+
+
+def synthetic_player(number: int, rng: random.Random) -> dict:
+    """The values of a player as they come out of the NBT and stats files, every string a separate object."""
+    inventory = [
+        {"Slot": slot, "id": rng.choice(ITEMS), "Count": rng.randint(1, 64), "tag": {"Damage": rng.randint(0, 100)}}
+        for slot in range(36)
+    ]
+    mob_kills = {mob: rng.randint(1, 500) for mob in rng.sample(MOBS, 15)}
+    # A json round trip gives every player its own copy of the strings, like parsing each file does
+    inventory, mob_kills = json.loads(json.dumps(inventory)), json.loads(json.dumps(mob_kills))
+    return dict(
+        uuid=f"{number:08x}-0000-4000-8000-{number:012x}",
+        name="".join(["player_", str(number)]),
+        race="human",
+        sub_race=None,
+        faction="pirate",
+        fighting_style="swordsman",
+        inventory=inventory,
+        devil_fruits=[],
+        eaten_devil_fruits=[],
+        inventory_devil_fruits=[],
+        belly=rng.randint(0, 10**6),
+        bounty=rng.randint(0, 10**6),
+        loyalty=rng.randint(0, 100),
+        doriki=rng.randint(0, 10**4),
+        harderning_haki=rng.random() * 100,
+        imbuing_haki=rng.random() * 100,
+        observation_haki=rng.random() * 100,
+        haoshoku_haki=False,
+        haki_limit=2200.0,
+        mob_kills=mob_kills,
+        discord_id=None,
+        last_seen=datetime.utcnow(),
+        inactive=False,
+    )
+
+
+def full_inventory(values: dict) -> PlayerData:
+    """Every inventory slot kept with all of its tags, as before."""
+    return PlayerData.trusted(**values)
+
+
+def summarised_inventory(values: dict) -> PlayerData:
+    """Inventory reduced to item counts, with interned names, item ids and mob ids, as Tasks.build_player does."""
+    counts = Counter()
+    for item in values["inventory"]:
+        counts[item["id"]] += item["Count"]
+    return PlayerData.trusted(
+        **dict(
+            values,
+            name=sys.intern(values["name"]),
+            inventory={sys.intern(item_id): count for item_id, count in counts.items()},
+            mob_kills={sys.intern(mob): kills for mob, kills in values["mob_kills"].items()},
+        )
+    )
+
+
+def measure(build, size: int) -> float:
+    """Bytes still allocated per player once a snapshot of the given size is built."""
+    rng = random.Random(size)
+    tracemalloc.start()
+    # Only what the player data keeps a reference to outlives each iteration
+    players = [build(synthetic_player(number, rng)) for number in range(size)]
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del players
+    return allocated / size
+
+
+if __name__ == "__main__":
+    print(f"{'players':>8} {'full inventory':>16} {'summary':>10}")
+    for size in (1_000, 10_000):
+        print(f"{size:>8} {measure(full_inventory, size):>14.0f} B {measure(summarised_inventory, size):>8.0f} B")
@@ -1,4 +1,5 @@
 import asyncio
+import time
 from pathlib import Path
 
 import discord
@@ -9,35 +10,59 @@ from beanie import init_beanie
 from discord.ext import commands
 
 from utils.configs import BotConfig
-from utils.database.models import Players, Users
+from utils.database.models import DailyStatSample, HourlyStatSample, Players, StatSample, Users
 from utils.functions import get_modules
-from utils.objects import FTPServer, Object, Translator
+from utils.log_store import LogStore
+from utils.members import MemberCache
+from utils.nicknames import NicknameSync
+from utils.objects import FruitRegistry, FTPServer, Object, PlayerData, PlayerSnapshot, Translator
+from utils.roles import RoleReconciler
+from utils.search import PlayerNameIndex
 from utils.tree import Tree
 
 
 class MineMineNoMi(commands.Bot):
     def __init__(self):
+        self.load_config()
+        linked_only = self.config.member_cache.policy == "linked"
+        intents = discord.Intents.all()
+        # Presence updates aren't needed once only linked players are cached
+        intents.presences = not linked_only
         super().__init__(
             command_prefix=">",
             description="A discord bot to monitor current Devilfruit Circulation from the MineMineNoMi mod",
             status=discord.Status.dnd,
             activity=discord.Game(f"Starting Up..."),
-            intents=discord.Intents.all(),
-            chunk_guilds_at_startup=True,
+            intents=intents,
+            chunk_guilds_at_startup=not linked_only,
+            member_cache_flags=discord.MemberCacheFlags.none() if linked_only else None,
             allowed_mentions=discord.AllowedMentions(replied_user=False),
             tree_cls=Tree,
         )
         self.modules_ready = asyncio.Event()
+        self.started_at = time.perf_counter()
+        self.startup_timings: dict[str, float] = {}
+        self.module_timings: dict[str, float] = {}
+        self._snapshot = PlayerSnapshot([])
         self.path = Path(__file__).parent
         self.modules_path = self.path.joinpath("modules")
         self.remove_command("help")
-        self.load_config()
 
     def load_config(self):
         """Loads the bot's config."""
         config = yaml.safe_load(open("config.yaml"))
         self.config = BotConfig(**config)
 
+    @property
+    def snapshot(self) -> PlayerSnapshot:
+        """The latest player data snapshot, keep a reference to it for a consistent view."""
+        return self._snapshot
+
+    def set_snapshot(self, players: list[PlayerData]) -> PlayerSnapshot:
+        """Replaces the player data snapshot with a new generation."""
+        self._snapshot = PlayerSnapshot(players, self._snapshot.generation + 1)
+        return self._snapshot
+
     async def setup_constants(self):
         """Sets up bot's constants."""
         self._last_exception = None
@@ -45,10 +70,18 @@ class MineMineNoMi(commands.Bot):
         self.GOLDEN_COLOR = 0xFFD700
         self.constants.RSession = ClientSession()
         self.FTPServer = FTPServer(self.config.ftp)
+        self.fruits = FruitRegistry.load()
+        self.role_sync = RoleReconciler(self.config.role_sync)
+        self.nicknames = NicknameSync(self.config.nickname_sync)
+        self.player_names = PlayerNameIndex()
+        self.members = MemberCache(self.config.member_cache)
+        self.log_store = LogStore(Path("cache/logs"))
 
     async def build_database(self):
         client = motor.motor_asyncio.AsyncIOMotorClient()
-        await init_beanie(database=client.mmnm, document_models=[Players, Users])
+        await init_beanie(
+            database=client.mmnm, document_models=[Players, Users, StatSample, HourlyStatSample, DailyStatSample]
+        )
 
     async def load_locales(self):
         self.locale = Translator(self)
@@ -58,15 +91,34 @@ class MineMineNoMi(commands.Bot):
     async def load_modules(self):
         """Loads all modules."""
         for module in get_modules(self.modules_path):
+            start = time.perf_counter()
             await self.load_extension(module.spec)
-            print(f"Loaded module {module.name}")
+            self.module_timings[module.name] = time.perf_counter() - start
+            print(f"Loaded module {module.name} in {self.module_timings[module.name]:.3f}s")
+
+    async def timed(self, stage: str, coro):
+        """Runs a startup stage, recording how long it took."""
+        start = time.perf_counter()
+        await coro
+        self.startup_timings[stage] = time.perf_counter() - start
+
+    def startup_report(self) -> str:
+        """How long each startup stage and module took, slowest modules first."""
+        lines = [f"{stage}: {seconds:.3f}s" for stage, seconds in self.startup_timings.items()]
+        modules = sorted(self.module_timings.items(), key=lambda x: x[1], reverse=True)
+        lines.extend(f"  {name}: {seconds:.3f}s" for name, seconds in modules)
+        return "\n".join(lines)
 
     async def setup_hook(self):
         """Bot's startup function."""
-        await self.setup_constants()
-        await self.build_database()
-        await self.load_locales()
-        await self.load_modules()
+        await self.timed("constants", self.setup_constants())
+        # The database, locales and modules don't depend on each other
+        await asyncio.gather(
+            self.timed("database", self.build_database()),
+            self.timed("locales", self.load_locales()),
+            self.timed("modules", self.load_modules()),
+        )
+        self.startup_timings["setup_hook"] = time.perf_counter() - self.started_at
 
         asyncio.create_task(self.change_status())
 
@@ -74,12 +126,22 @@ class MineMineNoMi(commands.Bot):
         """Changes the bot's status after a successful startup."""
         await self.wait_until_ready()
         self.modules_ready.set()
+        self.startup_timings["ready"] = time.perf_counter() - self.started_at
+        print(f"Startup timings:\n{self.startup_report()}")
         await self.change_presence(status=discord.Status.online)
 
     def run(self, **kwargs):
         # Run the bot
         super().run(self.config.discord_api_key, **kwargs)
 
+    async def close(self):
+        if hasattr(self, "FTPServer"):
+            await self.FTPServer.close()
+            self.role_sync.close()
+            self.nicknames.close()
+            self.log_store.close()
+        await super().close()
+
     async def on_message(self, message):
         """Handles messages and commands sent to the bot by owners."""
         if message.author.id not in self.config.bot_owners:
@@ -7,8 +7,8 @@ class FightingStyles(commands.Cog):
         self.bot = bot
 
     @commands.Cog.listener("on_player_data")
-    async def update_player_data(self, player_data: list[PlayerData]):
-        """Updates the devil fruit circulation."""
+    async def update_player_data(self, players: list[PlayerData]):
+        """Syncs the fighting style role of every linked member."""
         await self.bot.modules_ready.wait()
         guild = self.bot.get_guild(1014333541213024328)
         roles = {
@@ -22,20 +22,18 @@ class FightingStyles(commands.Cog):
                 ["ArtofWeather", 1015136306113818714],
             ]
         }
-        for player in player_data:
+        self.bot.role_sync.register("fighting_styles", [role.id for role in roles.values() if role])
+        # Every linked member is reconciled each tick, the role sync only queues the ones that don't match
+        for player in players:
             if player.discord_id is None:
                 continue
-            member = guild.get_member(player.discord_id)
+            member = await self.bot.members.get(guild, player.discord_id)
             if not member:
                 continue
             role = None
             if player.fighting_style:
                 role = roles.get(player.fighting_style.name)
-            if role and role not in member.roles:
-                await member.add_roles(role)
-            for not_role in roles.values():
-                if role != not_role and not_role in member.roles:
-                    await member.remove_roles(not_role)
+            self.bot.role_sync.set_roles(member, "fighting_styles", [role.id] if role else [])
 
 
 async def setup(bot):
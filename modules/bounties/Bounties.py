@@ -1,106 +1,132 @@
-from discord import Embed
+from discord import ButtonStyle, Embed, Interaction
 from discord.ext import commands
-from utils.objects import PlayerData, Factions
+from discord.ui import Button, View, button
+from utils.functions import chunks
+from utils.objects import Factions
+
+PAGE_SIZE = 20
+# name: (title, column, rows shown, line format of (value, name))
+LEADERBOARDS = {
+    "bounties": ("Bounties", "bounty", lambda stats: stats.bounty > 1000, "{:<7} - {}"),
+    "doriki": ("Doriki", "doriki", lambda stats: stats.doriki > 2000, "{:<5} - {}"),
+    "loyalty": (
+        "Loyalty",
+        "loyalty",
+        lambda stats: stats.faction == stats.code("faction", Factions.Marine),
+        "{:<4} - {}",
+    ),
+    "belly": ("Belly", "belly", lambda stats: stats.belly > 1000, "{:<7} - {}"),
+    "hardening": ("Hardening Haki", "harderning_haki", lambda stats: stats.harderning_haki > 0, "{:<4} - {}"),
+    "imbuing": ("Imbuing Haki", "imbuing_haki", lambda stats: stats.imbuing_haki > 0, "{:<4} - {}"),
+    "observation": ("Observation Haki", "observation_haki", lambda stats: stats.observation_haki > 0, "{:<4} - {}"),
+    "conqueror": ("Conquerors Haki", "haoshoku_haki", lambda stats: stats.haoshoku_haki, "{1}"),
+}
+
+
+class Leaderboard:
+    """A leaderboard's pages for one snapshot, each page's embed is only built the first time it's shown."""
+
+    def __init__(self, title: str, lines: list[str]):
+        self.title = title
+        self.pages = ["\n".join(page) for page in chunks(lines, PAGE_SIZE)] or [""]
+        self.embeds = {}
+
+    def embed(self, page: int) -> Embed:
+        if page not in self.embeds:
+            embed = Embed(title=self.title, description=f"```\n{self.pages[page]}\n```")
+            if len(self.pages) > 1:
+                embed.set_footer(text=f"Page {page + 1}/{len(self.pages)}")
+            self.embeds[page] = embed
+        return self.embeds[page]
+
+
+class LeaderboardView(View):
+    def __init__(self, leaderboard: Leaderboard):
+        super().__init__(timeout=180)
+        self.leaderboard = leaderboard
+        self.page = 0
+        self.update_buttons()
+
+    def update_buttons(self):
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page == len(self.leaderboard.pages) - 1
+
+    async def show_page(self, interaction: Interaction, page: int):
+        self.page = page
+        self.update_buttons()
+        await interaction.response.edit_message(embed=self.leaderboard.embed(page), view=self)
+
+    @button(label="Previous", style=ButtonStyle.grey)
+    async def previous_page(self, interaction: Interaction, button: Button):
+        await self.show_page(interaction, self.page - 1)
+
+    @button(label="Next", style=ButtonStyle.grey)
+    async def next_page(self, interaction: Interaction, button: Button):
+        await self.show_page(interaction, self.page + 1)
 
 
 class Bounties(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.players = []
+        self.generation = None
+        self.stats = None
+        self.leaderboards = {}
+
+    def get_leaderboard(self, name: str) -> Leaderboard:
+        """Gets a leaderboard, building it once per player data snapshot."""
+        snapshot = self.bot.snapshot
+        if snapshot.generation != self.generation:
+            # Imported here so numpy is only loaded once a leaderboard is first used
+            from utils.stats import PlayerStatStore
 
-    @commands.Cog.listener("on_player_data")
-    async def update_bounties(self, player_data: list[PlayerData]):
+            self.generation = snapshot.generation
+            self.stats = PlayerStatStore(snapshot.players)
+            self.leaderboards = {}
+        if name not in self.leaderboards:
+            title, column, rows, line = LEADERBOARDS[name]
+            self.leaderboards[name] = Leaderboard(
+                title, [line.format(*entry) for entry in self.stats.leaderboard(column, rows(self.stats))]
+            )
+        return self.leaderboards[name]
 
-        await self.bot.modules_ready.wait()
-        self.players = player_data
+    async def send_leaderboard(self, ctx, name: str):
+        leaderboard = self.get_leaderboard(name)
+        if len(leaderboard.pages) > 1:
+            await ctx.send(embed=leaderboard.embed(0), view=LeaderboardView(leaderboard))
+        else:
+            await ctx.send(embed=leaderboard.embed(0))
 
     @commands.hybrid_command(name="bounties", description="Lists all the bounties.")
     async def bounties(self, ctx):
-        e = Embed(title="Bounties", description="```\n")
-        for player in filter(
-            lambda x: x.bounty > 1000,
-            sorted(self.players, key=lambda x: x.bounty, reverse=True),
-        ):
-            e.description += "{:<7} - {}\n".format(player.bounty, player.name)
-        e.description += "```"
-        await ctx.send(embed=e)
+        await self.send_leaderboard(ctx, "bounties")
 
     @commands.hybrid_command(name="doriki", description="Lists all the doriki.")
     async def doriki(self, ctx):
-        e = Embed(title="Doriki", description="```\n")
-        for player in filter(
-            lambda x: x.doriki > 2000,
-            sorted(self.players, key=lambda x: x.doriki, reverse=True),
-        ):
-            e.description += "{:<5} - {}\n".format(player.doriki, player.name)
-        e.description += "```"
-        await ctx.send(embed=e)
+        await self.send_leaderboard(ctx, "doriki")
 
     @commands.hybrid_command(name="loyalty", description="Lists all the loyalty.")
     async def loyalty(self, ctx):
-        e = Embed(title="Loyalty", description="```\n")
-        for player in filter(
-            lambda x: x.faction == Factions.Marine,
-            sorted(self.players, key=lambda x: x.loyalty, reverse=True),
-        ):
-            e.description += "{:<4} - {}\n".format(player.loyalty, player.name)
-        e.description += "```"
-        await ctx.send(embed=e)
+        await self.send_leaderboard(ctx, "loyalty")
 
     @commands.hybrid_command(name="belly", description="Lists all the belly.")
     async def belly(self, ctx):
-        e = Embed(title="Belly", description="```\n")
-        for player in filter(
-            lambda x: x.belly > 1000,
-            sorted(self.players, key=lambda x: x.belly, reverse=True),
-        ):
-            e.description += "{:<7} - {}\n".format(player.belly, player.name)
-        e.description += "```"
-        await ctx.send(embed=e)
+        await self.send_leaderboard(ctx, "belly")
 
     @commands.hybrid_command(name="hardening", description="Lists all the hardening Haki.")
     async def harderning_haki(self, ctx):
-        e = Embed(title="Hardening Haki", description="```\n")
-        for player in filter(
-            lambda x: x.harderning_haki > 0,
-            sorted(self.players, key=lambda x: x.harderning_haki, reverse=True),
-        ):
-            e.description += "{:<4} - {}\n".format(player.harderning_haki, player.name)
-        e.description += "```"
-        await ctx.send(embed=e)
+        await self.send_leaderboard(ctx, "hardening")
 
     @commands.hybrid_command(name="imbuing", description="Lists all the imbuing Haki.")
     async def imbuing_haki(self, ctx):
-        e = Embed(title="Imbuing Haki", description="```\n")
-        for player in filter(
-            lambda x: x.imbuing_haki > 0,
-            sorted(self.players, key=lambda x: x.imbuing_haki, reverse=True),
-        ):
-            e.description += "{:<4} - {}\n".format(player.imbuing_haki, player.name)
-        e.description += "```"
-        await ctx.send(embed=e)
+        await self.send_leaderboard(ctx, "imbuing")
 
     @commands.hybrid_command(name="observation", description="Lists all the observation Haki.")
     async def observation_haki(self, ctx):
-        e = Embed(title="Observation Haki", description="```\n")
-        for player in filter(
-            lambda x: x.observation_haki > 0,
-            sorted(self.players, key=lambda x: x.observation_haki, reverse=True),
-        ):
-            e.description += "{:<4} - {}\n".format(player.observation_haki, player.name)
-        e.description += "```"
-        await ctx.send(embed=e)
+        await self.send_leaderboard(ctx, "observation")
 
     @commands.hybrid_command(name="conqueror", description="Lists all the conqueror Haki.")
     async def conqueror_haki(self, ctx):
-        e = Embed(title="Conquerors Haki", description="```\n")
-        for player in filter(
-            lambda x: x.haoshoku_haki > 0,
-            sorted(self.players, key=lambda x: x.haoshoku_haki, reverse=True),
-        ):
-            e.description += "{}\n".format(player.name)
-        e.description += "```"
-        await ctx.send(embed=e)
+        await self.send_leaderboard(ctx, "conqueror")
 
 
 async def setup(bot):
@@ -3,25 +3,16 @@ from pathlib import Path
 
 from discord import Embed, Attachment, app_commands, File
 from discord.ext import commands
-from mcrcon import MCRcon
-from utils.objects import PlayerData
 from utils.checks import is_bot_owner_interaction
+from utils.functions import rcon_client
+import math
 import re
 from io import BytesIO
 
-import numpy as np
-
 
 class General(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.players = []
-
-    @commands.Cog.listener("on_player_data")
-    async def update_player_data(self, player_data: list[PlayerData]):
-        """Updates the devil fruit circulation."""
-        await self.bot.modules_ready.wait()
-        self.players = player_data
 
     @app_commands.command(name="mods")
     async def mods(self, interaction):
@@ -59,9 +50,7 @@ class General(commands.Cog):
     @app_commands.command(name="rcon", description="Run a console command.")
     @is_bot_owner_interaction()
     async def rcon(self, interaction, command: str):
-        with MCRcon(
-            host=self.bot.config.rcon_ip, password=self.bot.config.rcon_password, port=self.bot.config.rcon_port
-        ) as rcon:
+        with rcon_client(self.bot.config) as rcon:
             response = rcon.command(f"/{command}")
             await interaction.response.send_message(response or "Command ran successfully")
 
@@ -86,9 +75,7 @@ class General(commands.Cog):
             "damage-monsters",
             "damage-animals",
         ]
-        with MCRcon(
-            host=self.bot.config.rcon_ip, password=self.bot.config.rcon_password, port=self.bot.config.rcon_port
-        ) as rcon:
+        with rcon_client(self.bot.config) as rcon:
             mode = "add" if protect else "remove"
             for flag in flags:
                 rcon.command(f"/execute as @a run flag {mode} {region} {flag}")
@@ -129,9 +116,7 @@ class General(commands.Cog):
         rotations: int = 1,
     ):
         await interaction.response.defer()
-        with MCRcon(
-            host=self.bot.config.rcon_ip, password=self.bot.config.rcon_password, port=self.bot.config.rcon_port
-        ) as rcon:
+        with rcon_client(self.bot.config) as rcon:
             for _ in range(rotations):
                 if doriki:
                     adoriki = doriki / 0.66 - doriki
@@ -158,16 +143,14 @@ class General(commands.Cog):
     @restore_stats.autocomplete("player")
     async def restore_stats_autocomplete(self, ctx, current: str):
         """Autocomplete for the player command."""
-        players = list(filter(lambda x: x.name.lower().startswith(current.lower()), self.players))
-        return [app_commands.Choice(name=player.name, value=player.name) for player in players][:25]
+        players = self.bot.player_names.search(current)
+        return [app_commands.Choice(name=name, value=name) for name, uuid in players]
 
     @app_commands.command(name="summon_trainer")
     @app_commands.checks.cooldown(1, 900.0, key=lambda i: i.user.id)
     async def summon_trainer(self, interaction, player: str, trainer: str):
         await interaction.response.defer()
-        with MCRcon(
-            host=self.bot.config.rcon_ip, password=self.bot.config.rcon_password, port=self.bot.config.rcon_port
-        ) as rcon:
+        with rcon_client(self.bot.config) as rcon:
             noAI = "{NoAI:1}"
             response = rcon.command(f"/execute at {player} run summon {trainer} ~ ~ ~ {noAI}")
             await interaction.followup.send(response)
@@ -175,8 +158,8 @@ class General(commands.Cog):
     @summon_trainer.autocomplete("player")
     async def summon_trainer_player_autocomplete(self, ctx, current: str):
         """Autocomplete for the player command."""
-        players = list(filter(lambda x: x.name.lower().startswith(current.lower()), self.players))
-        return [app_commands.Choice(name=player.name, value=player.name) for player in players][:25]
+        players = self.bot.player_names.search(current)
+        return [app_commands.Choice(name=name, value=name) for name, uuid in players]
 
     @summon_trainer.autocomplete("trainer")
     async def summon_trainer_trainer_autocomplete(self, ctx, current: str):
@@ -197,11 +180,11 @@ class General(commands.Cog):
         coords = ""
 
     def get_points(self, radius, number_of_points, x=0, y=0):
-        radians_between_each_point = 2 * np.pi / number_of_points
+        radians_between_each_point = 2 * math.pi / number_of_points
         for p in range(0, number_of_points):
             yield (
-                int(radius * np.cos(p * radians_between_each_point) + x),
-                int(radius * np.sin(p * radians_between_each_point) + y),
+                int(radius * math.cos(p * radians_between_each_point) + x),
+                int(radius * math.sin(p * radians_between_each_point) + y),
             )
 
     @app_commands.command(name="boss_rewards")
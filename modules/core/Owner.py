@@ -95,6 +95,25 @@ class Owner(commands.Cog):
         else:
             await ctx.reply("No error.", ephemeral=True)
 
+    @commands.hybrid_command(name="nickname_sync", description="Shows nickname sync counters.")
+    @is_bot_owner()
+    async def nickname_sync(self, ctx):
+        """Shows nickname sync counters."""
+        counters = self.bot.nicknames.counters
+        await ctx.send(
+            f"Applied: {counters['applied']}\n"
+            f"Skipped: {counters['skipped']}\n"
+            f"Failed: {counters['failed']}\n"
+            f"Pending: {len(self.bot.nicknames.pending)}",
+            ephemeral=True,
+        )
+
+    @commands.hybrid_command(name="startup", description="Shows how long the bot took to start up.")
+    @is_bot_owner()
+    async def startup(self, ctx):
+        """Shows how long the bot took to start up."""
+        await ctx.send(f"```\n{self.bot.startup_report()}\n```", ephemeral=True)
+
     @commands.hybrid_command(name="sync", description="Sync the bot's slash commands.")
     @is_bot_owner()
     async def sync(self, ctx):
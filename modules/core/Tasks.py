@@ -1,132 +1,229 @@
 import asyncio
-import gzip
 import json
-import re
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta
-from io import BytesIO
 from pathlib import Path
 from random import sample
+from typing import NamedTuple, Optional
 
 from discord import Interaction, app_commands
 from discord.ext import commands, tasks
-from discord.utils import get
-from nbt.nbt import NBTFile
-from utils.converters import get_uuid_from_parts
-from utils.functions import convert_nbt_to_dict, open_file, get_mc_player
-from utils.objects import DevilFruit, PlayerData
+from utils.functions import get_mc_players
+from utils.logs import LogBatch, LogIngester
+from utils.objects import MinecraftPlayer, PlayerData, PlayerDelta
+from utils.parsing import PlayerRecord, parse_inventory, parse_logged_out_fruits, parse_player_file
+
+
+class CachedPlayer(NamedTuple):
+    """A parsed player file, keyed by its (size, mtime) fingerprint, with the player data last built from it."""
+
+    fingerprint: tuple[int, float]
+    record: Optional[PlayerRecord]  # None when the file has no player data yet
+    mob_kills: dict
+    key: Optional[tuple] = None
+    player: Optional[PlayerData] = None
 
 
 class Tasks(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.fruits = list(self.list_devil_fruits(json.load(open("resources/fruits.json"))))
         self.nbt_path = Path(f"/default/{self.bot.config.world_name}/data/mineminenomi.dat")
         self.player_data_path = Path(f"/default/{self.bot.config.world_name}/playerdata/")
         self.cache_player_data_path = Path(f"/home/{self.bot.config.linux_user}/MMnM/cache/player_data/")
         self.player_stats_path = Path(f"/default/{self.bot.config.world_name}/stats/")
         self.logs_path = Path(f"default/logs")
-        self.players = []
+        self.log_ingester = LogIngester(self.logs_path, self.bot.log_store.ingester_state)
+        self.executor = None
+        self.world_files = {}
+        self.parse_cache = {}
+        self.player_files: dict[str, str] = {}
 
     async def cog_load(self):
+        self.executor = self.create_executor()
         self.read_mmnm_player_data.start()
         self.retrieve_logs.start()
 
     async def cog_unload(self):
         self.read_mmnm_player_data.cancel()
         self.retrieve_logs.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def create_executor(self) -> ProcessPoolExecutor:
+        # Workers are started from a clean server process, a forked one could inherit a lock held by another thread
+        return ProcessPoolExecutor(
+            max_workers=self.bot.config.ingestion.parse_workers or os.cpu_count(),
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
 
     @tasks.loop(seconds=30)
     async def read_mmnm_player_data(self):
-        """Reads player data every seconds."""
+        """Reads player data every 30 seconds."""
         await self.bot.modules_ready.wait()
         guild = self.bot.get_guild(self.bot.config.discord_server_id)
         if not guild:
             return
+        try:
+            await self.ingest_player_data(guild)
+        except BrokenProcessPool:
+            print("A player data parser died, restarting the parser processes.")
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = self.create_executor()
+
+    async def ingest_player_data(self, guild):
+        """Reads the player data files that changed and dispatches the new snapshot."""
         linked_role = guild.get_role(self.bot.config.link_role)
         players = []
-        username_cache = json.loads(await self.bot.FTPServer.get_file(f"/default/usernamecache.json"))
-        mineminenomi_bytes = await self.bot.FTPServer.get_file(self.nbt_path)
-        mineminenomi_data = convert_nbt_to_dict(NBTFile(fileobj=BytesIO(mineminenomi_bytes)))
+        loop = asyncio.get_running_loop()
+        username_cache = await self.fetch_world_file("/default/usernamecache.json", json.loads)
+        logged_out_fruits = await self.fetch_world_file(
+            self.nbt_path, lambda data: loop.run_in_executor(self.executor, parse_logged_out_fruits, data)
+        )
         timed_out_fruits = {
-            get_uuid_from_parts(inventory["uuidMost"], inventory["uuidLeast"]): [
-                get(self.fruits, qualified_name=inventory[f"fruit-{fruit_n}"]) for fruit_n in range(inventory["fruits"])
-            ]
-            for inventory in mineminenomi_data["data"]["loggedoutFruits"]
-            if inventory["date"] / 1000 < (datetime.utcnow() - timedelta(days=3)).timestamp()
+            uuid: fruits
+            for uuid, (date, fruits) in logged_out_fruits.items()
+            if date / 1000 < (datetime.utcnow() - timedelta(days=3)).timestamp()
         }
         now = datetime.utcnow()
-        await self.bot.FTPServer.download_player_data(self.player_data_path)
+        sync = await self.bot.FTPServer.download_player_data(self.player_data_path)
+        changed = {cached_file.name for cached_file in sync.changed}
+        parse_cache = {}
+        parsing = {}
+        transfers = asyncio.Semaphore(self.bot.config.ftp.pool_size)
         for player_data in self.cache_player_data_path.glob("*.dat"):
-            last_time = datetime.utcfromtimestamp(int(player_data.lstat().st_mtime))
-            if old_player := get(self.players, uuid=player_data.stem):
-                if last_time < now - timedelta(days=5):
-                    players.append(old_player)
-                    continue
-            nbt_bytes = open_file(self.cache_player_data_path.joinpath(player_data))
-            nbt_data = convert_nbt_to_dict(NBTFile(fileobj=BytesIO(nbt_bytes)))
-            player_uuid = player_data.stem
-            stats_data = await self.bot.FTPServer.get_file(self.player_stats_path.joinpath(f"{player_uuid}.json"))
-            stats_data = json.loads(stats_data)
-            forgeCaps = nbt_data.get("ForgeCaps", {})
-            if not forgeCaps:
+            stat = player_data.stat()
+            fingerprint = (stat.st_size, stat.st_mtime)
+            cached = self.parse_cache.get(player_data.stem)
+            if cached and cached.fingerprint == fingerprint and player_data.name not in changed:
+                parse_cache[player_data.stem] = cached
+            else:
+                parsing[player_data.stem] = self.load_player(player_data, fingerprint, transfers)
+        parse_cache.update(zip(parsing, await asyncio.gather(*parsing.values())))
+        mc_players = await get_mc_players(
+            username_cache, [cached.record.uuid for cached in parse_cache.values() if cached.record]
+        )
+        for file_uuid, cached in parse_cache.items():
+            if cached.record is None:
                 continue
-            # Devil Fruits
-            eaten_devil_fruits = []
-            inventory_devil_fruits = []
-            if not timed_out_fruits.get(player_uuid):
-                yami = forgeCaps["mineminenomi:devil_fruit"]["hasYamiPower"]
-                if fruit := get(
-                    self.fruits,
-                    qualified_name=forgeCaps["mineminenomi:devil_fruit"].get("devilFruit", ""),
-                ):
-                    eaten_devil_fruits.append(fruit)
-                if yami:
-                    eaten_devil_fruits.append(get(self.fruits, qualified_name="yami_yami"))
-                for item in nbt_data["Inventory"]:
-                    if re.match(r"mineminenomi:([a-z_]+no_mi)", item["id"]):
-                        inventory_devil_fruits.append(get(self.fruits, name=item["id"].split(":")[1]))
-            # Player Stats
-            stats = forgeCaps["mineminenomi:entity_stats"]
-            haki_stats = forgeCaps["mineminenomi:haki_data"]
-            abilities = forgeCaps["mineminenomi:ability_data"]["unlocked_abilities"]
-            haoshoku = bool([x for x in abilities if x["name"] == "haoshoku_haki"])
-            uuid = get_uuid_from_parts(nbt_data["UUIDMost"], nbt_data["UUIDLeast"])
-            mc_data = await get_mc_player(username_cache, uuid)
-            total_haki = (
-                haki_stats["busoHardeningHakiExp"] + haki_stats["busoImbuingHakiExp"] + haki_stats["kenHakiExp"]
-            )
-            player = PlayerData(
-                uuid=uuid,
-                name=mc_data.name,
-                race=stats["race"] or None,
-                sub_race=stats["subRace"] or None,
-                faction=stats["faction"] or None,
-                fighting_style=stats["fightingStyle"] or None,
-                inventory=nbt_data["Inventory"],
-                devil_fruits=eaten_devil_fruits + inventory_devil_fruits,
-                eaten_devil_fruits=eaten_devil_fruits,
-                inventory_devil_fruits=inventory_devil_fruits,
-                belly=stats["belly"],
-                bounty=stats["bounty"],
-                loyalty=stats["loyalty"],
-                doriki=stats["doriki"],
-                harderning_haki=haki_stats["busoHardeningHakiExp"],
-                imbuing_haki=haki_stats["busoImbuingHakiExp"],
-                observation_haki=haki_stats["kenHakiExp"],
-                haoshoku_haki=haoshoku,
-                haki_limit=round(2200 + (total_haki * 32), 1),
-                mob_kills=stats_data.get("stats", {}).get("minecraft:killed", {}),
-                discord_id=mc_data.discord_id,
-                last_seen=last_time,
-                inactive=last_time < now - timedelta(days=5),
+            cached = parse_cache[file_uuid] = self.enrich_player(
+                cached, mc_players[cached.record.uuid], timed_out_fruits, now
             )
-            players.append(player)
-            if player.discord_id is not None and linked_role:
-                member = guild.get_member(player.discord_id)
-                if member and linked_role not in member.roles:
-                    asyncio.create_task(member.add_roles(linked_role))
+            players.append(cached.player)
+        self.parse_cache = parse_cache
+        self.player_files = {
+            cached.record.uuid: file_uuid for file_uuid, cached in parse_cache.items() if cached.record
+        }
+        linked = [player.discord_id for player in players if player.discord_id is not None]
+        await self.bot.members.keep(guild, linked + self.bot.config.bot_owners + self.bot.config.member_cache.staff)
+        if linked_role:
+            self.bot.role_sync.register("link", [linked_role.id])
+            for player in players:
+                if player.discord_id is None:
+                    continue
+                if member := await self.bot.members.get(guild, player.discord_id):
+                    self.bot.role_sync.set_roles(member, "link", [linked_role.id])
+        delta = PlayerDelta.between(self.bot.snapshot.players, players)
+        self.bot.set_snapshot(players)
+        self.bot.player_names.update(delta)
         self.bot.dispatch("player_data", players)
-        self.players = players
+        if delta:
+            self.bot.dispatch("player_data_delta", delta)
+
+    async def load_player(
+        self, path: Path, fingerprint: tuple[int, float], transfers: asyncio.Semaphore
+    ) -> CachedPlayer:
+        """Parses a player file in the process pool and fetches the player's stats."""
+        record = await asyncio.get_running_loop().run_in_executor(self.executor, parse_player_file, str(path))
+        if record is None:
+            return CachedPlayer(fingerprint, None, {})
+        async with transfers:
+            stats_data = await self.bot.FTPServer.get_file(self.player_stats_path.joinpath(f"{record.file_uuid}.json"))
+        mob_kills = json.loads(stats_data).get("stats", {}).get("minecraft:killed", {})
+        mob_kills = {sys.intern(mob): kills for mob, kills in mob_kills.items()}
+        return CachedPlayer(fingerprint, record, mob_kills)
+
+    async def fetch_world_file(self, path, parser):
+        """Returns the parsed form of a world file, only fetching and parsing it again once it changed."""
+        info = await self.bot.FTPServer.stat(path)
+        fingerprint = (info["size"], info["modify"])
+        cached = self.world_files.get(str(path))
+        if cached is None or cached[0] != fingerprint:
+            parsed = parser(await self.bot.FTPServer.get_file(path))
+            if asyncio.isfuture(parsed):
+                parsed = await parsed
+            cached = self.world_files[str(path)] = (fingerprint, parsed)
+        return cached[1]
+
+    def enrich_player(
+        self, cached: CachedPlayer, mc_data: MinecraftPlayer, timed_out_fruits: dict, now: datetime
+    ) -> CachedPlayer:
+        """Builds the player data of a parsed record, reusing the previous one if nothing it depends on changed."""
+        record = cached.record
+        last_time = datetime.utcfromtimestamp(int(record.modified))
+        key = (
+            mc_data.name,
+            mc_data.discord_id,
+            bool(timed_out_fruits.get(record.file_uuid)),
+            last_time < now - timedelta(days=5),
+        )
+        if cached.player is not None and cached.key == key:
+            return cached
+        return cached._replace(key=key, player=self.build_player(record, cached.mob_kills, mc_data, *key[2:]))
+
+    def build_player(
+        self, record: PlayerRecord, mob_kills: dict, mc_data: MinecraftPlayer, timed_out: bool, inactive: bool
+    ) -> PlayerData:
+        """Builds the player data dispatched to the modules from a parsed player record."""
+        last_time = datetime.utcfromtimestamp(int(record.modified))
+        # Devil Fruits
+        eaten_devil_fruits = []
+        inventory_devil_fruits = []
+        if not timed_out:
+            if fruit := self.bot.fruits.get(record.devil_fruit):
+                eaten_devil_fruits.append(fruit)
+            if record.has_yami_power:
+                eaten_devil_fruits.append(self.bot.fruits.get("yami_yami"))
+            for fruit_name in record.inventory_devil_fruits:
+                if fruit := self.bot.fruits.get_by_name(fruit_name):
+                    inventory_devil_fruits.append(fruit)
+        # Player Stats
+        total_haki = record.harderning_haki + record.imbuing_haki + record.observation_haki
+        return PlayerData.trusted(
+            uuid=record.uuid,
+            name=sys.intern(mc_data.name),
+            race=record.race or None,
+            sub_race=record.sub_race or None,
+            faction=record.faction or None,
+            fighting_style=record.fighting_style or None,
+            inventory={sys.intern(item_id): count for item_id, count in record.inventory},
+            devil_fruits=eaten_devil_fruits + inventory_devil_fruits,
+            eaten_devil_fruits=eaten_devil_fruits,
+            inventory_devil_fruits=inventory_devil_fruits,
+            belly=record.belly,
+            bounty=record.bounty,
+            loyalty=record.loyalty,
+            doriki=record.doriki,
+            harderning_haki=record.harderning_haki,
+            imbuing_haki=record.imbuing_haki,
+            observation_haki=record.observation_haki,
+            haoshoku_haki=record.haoshoku_haki,
+            haki_limit=round(2200 + (total_haki * 32), 1),
+            mob_kills=mob_kills,
+            discord_id=mc_data.discord_id,
+            last_seen=last_time,
+            inactive=inactive,
+        )
+
+    async def load_inventory(self, player: PlayerData) -> list[dict]:
+        """Reads every inventory slot of a player from the cached player file, with all of its tags."""
+        file_uuid = self.player_files.get(player.uuid)
+        if file_uuid is None:
+            return []
+        path = self.cache_player_data_path.joinpath(f"{file_uuid}.dat")
+        return await asyncio.get_running_loop().run_in_executor(self.executor, parse_inventory, str(path))
 
     # @read_mmnm_player_data.error()
     # async def test(self, **kwargs):
@@ -134,55 +231,25 @@ class Tasks(commands.Cog):
 
     @tasks.loop(minutes=5)
     async def retrieve_logs(self):
-        """Retrieves logs every 5 minutes."""
+        """Reads what was added to the server logs every 5 minutes."""
         await self.bot.modules_ready.wait()
-        return
-        logs = []
-        for log in self.logs_path.iterdir():
-            bytes_data = open_file(log)
-            log_string = re.search(r"(\d{4}-\d{2}-\d{2})-(\d{1,2})", log)
-            if log_string is None:
-                if log == "latest.log":
-                    log_date = datetime.utcnow()
-                    index = 0
-                else:
-                    continue
-            else:
-                log_date = datetime.strptime(log_string.group(1), "%Y-%m-%d")
-                index = log_string.group(2)
-            log_data = {"name": log, "date": log_date, "index": index, "lines": []}
-
-            def remove_IP(line):
-                return re.sub(r"\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}", "*", line)
-
-            if log.endswith(".log.gz"):
-                data = gzip.GzipFile(fileobj=BytesIO(bytes_data))
-                log_text = data.read().decode("utf-8")
-                for line in log_text.split("\n"):
-                    if not line:
-                        continue
-                    log_data["lines"].append(remove_IP(line))
-            elif log.endswith(".log"):
-                log_text = bytes_data.decode("utf-8")
-                for line in log_text.split("\n"):
-                    if not line:
-                        continue
-                    log_data["lines"].append(remove_IP(line))
-            logs.append(log_data)
-        self.bot.dispatch("logs_read", sorted(logs, key=lambda x: (x["date"], x["index"])))
-
-    def list_devil_fruits(self, data: dict):
-        """List all devil fruits."""
-        for rarity, fruits in data.items():
-            for fruit in fruits:
-                for qualified_name, devil_fruit in fruit.items():
-                    yield DevilFruit(rarity=rarity, qualified_name=qualified_name, **devil_fruit)
+        batches = await asyncio.to_thread(self.ingest_logs)
+        if batches:
+            self.bot.dispatch("logs_read", batches)
+
+    def ingest_logs(self) -> list[LogBatch]:
+        """Reads the new log lines into the log store, meant to run in a thread."""
+        batches = self.log_ingester.ingest()
+        if not batches:
+            return []
+        return self.bot.log_store.append(batches, self.log_ingester.state())
 
     @app_commands.command(name="random_player")
     async def random_player(self, interaction: Interaction, size: int = 1):
         """Random player."""
         try:
-            players = sample([p for p in self.players if p.last_seen > datetime.utcnow() - timedelta(days=2)], k=size)
+            since = datetime.utcnow() - timedelta(days=2)
+            players = sample([p for p in self.bot.snapshot if p.last_seen > since], k=size)
         except ValueError:
             return await interaction.response.send_message("Not enough players to satisfy {} request.".format(size))
         await interaction.response.send_message(
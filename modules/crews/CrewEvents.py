@@ -13,12 +13,12 @@ class CrewEvents(commands.Cog):
         crews = await db.crews.get_crews(self.bot.db_path)
         for crew_data in nbt["data"]["crews"]:
             if get(crews, name=crew_data["name"]) is None:
-                self.bot.dispatch("crew_created", Crew(**crew_data))
+                self.bot.dispatch("crew_created", Crew.trusted(**crew_data))
         for crew in crews:
             if get(nbt["data"]["crews"], name=crew.name) is None:
                 self.bot.dispatch("crew_deleted", Crew(**crew))
         for crew_data in nbt["data"]["crews"]:
-            crew = Crew(**crew_data)
+            crew = Crew.trusted(**crew_data)
             for member in crew.members:
                 ...
 
@@ -13,7 +13,7 @@ class Crews(commands.Cog):
     @commands.Cog.listener("on_mmnm_nbt_read")
     async def update_nbt_data(self, nbt: dict):
         self.mmnm_crews = sorted(
-            [Crew(**crew) for crew in nbt["data"]["crews"]],
+            [Crew.trusted(**crew) for crew in nbt["data"]["crews"]],
             key=lambda x: x.name,
         )
 
@@ -1,5 +1,4 @@
 from datetime import datetime
-from json import load
 import json
 
 from discord import Embed, app_commands
@@ -7,7 +6,7 @@ from discord.errors import NotFound
 from discord.ext import commands
 from discord.utils import get
 from utils.functions import chunks
-from utils.objects import DevilFruit, PlayerData
+from utils.objects import DevilFruit, PlayerDelta
 
 
 class devil_fruit_circulation(commands.Cog):
@@ -16,8 +15,7 @@ class devil_fruit_circulation(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.config = self.bot.config.devil_fruits
-        self.fruits = list(self.list_devil_fruits(load(open("resources/fruits.json"))))
-        self.players = []
+        self.fruits = self.bot.fruits
 
     async def get_editable_message(self, channel):
         """Gets a message that can be edited from the specified channel."""
@@ -31,12 +29,13 @@ class devil_fruit_circulation(commands.Cog):
                 return m
         return None
 
-    @commands.Cog.listener("on_player_data")
-    async def update_df_circulation(self, player_data: list[PlayerData]):
-        """Updates the devil fruit circulation."""
+    @commands.Cog.listener("on_player_data_delta")
+    async def update_df_circulation(self, delta: PlayerDelta):
+        """Updates the devil fruit circulation when someone's devil fruits changed."""
         await self.bot.modules_ready.wait()
-        self.players = player_data
-        devil_fruits = [fruit for player in player_data for fruit in player.devil_fruits]
+        if not delta.updated("devil_fruits") and not any(player.devil_fruits for player in delta.removed):
+            return
+        devil_fruits = {fruit for player in delta.players for fruit in player.devil_fruits}
         channel = self.bot.get_channel(self.config.channel)
         update = self.build_formatted_message(devil_fruits)
         if not hasattr(self, "df_message"):
@@ -55,7 +54,7 @@ class devil_fruit_circulation(commands.Cog):
                 self.df_message = await channel.send(embed=update)
         await self.df_message.edit(embed=update)
 
-    def build_formatted_message(self, unavailable_fruits: list[DevilFruit]) -> Embed:
+    def build_formatted_message(self, unavailable_fruits: set[DevilFruit]) -> Embed:
         """Builds the formatted message to be sent to the channel."""
         emojis = {
             "golden_box_emoji": self.bot.get_emoji(self.config.golden_box),
@@ -72,10 +71,9 @@ class devil_fruit_circulation(commands.Cog):
             timestamp=datetime.utcnow(),
         )
         embed.set_footer(text="Updates every 5 minutes | Last updated")
-        order = ["wooden_box", "iron_box", "golden_box"]
         available_fruits = [
             f"{emojis.get(fruit.rarity+'_emoji')}{fruit.format_name}"
-            for fruit in sorted(self.fruits, key=lambda x: (order.index(x.rarity), x.format_name))
+            for fruit in self.fruits
             if fruit not in unavailable_fruits
         ]
         available_fruits_fields = chunks(available_fruits, 8)
@@ -88,13 +86,6 @@ class devil_fruit_circulation(commands.Cog):
             )
         return embed
 
-    def list_devil_fruits(self, data: dict):
-        """List all devil fruits."""
-        for rarity, fruits in data.items():
-            for fruit in fruits:
-                for qualified_name, devil_fruit in fruit.items():
-                    yield DevilFruit(rarity=rarity, qualified_name=qualified_name, **devil_fruit)
-
     def list_golden_devil_fruits(self, data: list[DevilFruit]):
         """List all golden box devil fruits."""
         return list(filter(lambda x: x.rarity == "golden_box", data))
@@ -132,9 +123,9 @@ class devil_fruit_circulation(commands.Cog):
     @app_commands.command(name="check_fruit", description="Get information about who owns a devil fruit.")
     async def devilfruit(self, interaction, fruit_name: str):
         """Gets information about a devil fruit."""
-        fruit = get(self.fruits, qualified_name=fruit_name)
+        fruit = self.fruits.get(fruit_name)
         embed = Embed(description=f"**{fruit.format_name}** Devil Fruit Owners")
-        for player in self.players:
+        for player in self.bot.snapshot:
             if fruit in player.devil_fruits:
                 embed.add_field(
                     name=player.name,
@@ -165,13 +156,11 @@ class devil_fruit_circulation(commands.Cog):
     @app_commands.command(name="duplicate_df", description="List Devil Fruit dupes.")
     async def get_duplicates(self, interaction):
         """List Devil Fruit dupes."""
-        fruits_list = {}
-        for fruit in self.fruits:
-            for player in self.players:
-                if fruit in player.devil_fruits:
-                    if fruit.format_name not in fruits_list:
-                        fruits_list[fruit.format_name] = []
-                    fruits_list[fruit.format_name].append([player.name, player.uuid])
+        owners = {}
+        for player in self.bot.snapshot:
+            for fruit in set(player.devil_fruits):
+                owners.setdefault(fruit, []).append([player.name, player.uuid])
+        fruits_list = {fruit.format_name: owners[fruit] for fruit in sorted(owners, key=lambda x: x.position)}
 
         await interaction.response.send_message(
             f"""```\n{json.dumps({k: v for k, v in fruits_list.items() if len(v) > 1}, indent=4)}\n```"""
@@ -181,7 +170,7 @@ class devil_fruit_circulation(commands.Cog):
     async def too_many_df(self, interaction):
         """List Devil Fruit dupes."""
         fruits_list = {}
-        for player in self.players:
+        for player in self.bot.snapshot:
             if len(player.inventory_devil_fruits) > 1:
                 fruits_list[player.name].extend([f.format_name for f in player.inventory_devil_fruits])
 
@@ -193,7 +182,7 @@ class devil_fruit_circulation(commands.Cog):
     async def get_fruit_owners(self, interaction):
         """List Devil Fruit dupes."""
         embed = Embed(title="Devil Fruit owners", description="")
-        for player in self.players:
+        for player in self.bot.snapshot:
             if player.devil_fruits:
                 embed.description += f"{len(player.devil_fruits)}x Devil Fruits owned by {player.name}\n"
         await interaction.response.send_message(embed=embed)
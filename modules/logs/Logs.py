@@ -1,57 +1,72 @@
+import asyncio
 from io import BytesIO
 
 from discord import File, app_commands
 from discord.ext import commands
-from discord.utils import get
+from utils.logs import LATEST_LOG, LogBatch, LogIndex
 from utils.objects import PlayerData
 
 
 class Logs(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.logs = []
-        self.players = []
+        # Only latest.log, rotated logs are searched through the postings the log store saved with them
+        self.index = LogIndex()
+        # Held while the index is updated in a thread, so lookups never see it half written
+        self.index_lock = asyncio.Lock()
 
-    @commands.Cog.listener("on_player_data")
-    async def update_player_data(self, player_data: list[PlayerData]):
-        """Updates the devil fruit circulation."""
-        await self.bot.modules_ready.wait()
-        self.players = player_data
+    async def cog_load(self):
+        asyncio.create_task(self.index_latest_log())
+
+    async def index_latest_log(self):
+        """Indexes the part of latest.log already in the log store."""
+        async with self.index_lock:
+            lines = await asyncio.to_thread(self.bot.log_store.read_all, LATEST_LOG)
+            await asyncio.to_thread(self.index.add, LATEST_LOG, 0, lines)
 
     @commands.Cog.listener("on_logs_read")
-    async def on_logs_fetched(self, logs: list[dict]):
+    async def on_logs_fetched(self, batches: list[LogBatch]):
+        """Indexes the lines appended to latest.log, starting over when it was rotated."""
         await self.bot.modules_ready.wait()
-        self.logs = logs
+        async with self.index_lock:
+            for batch in batches:
+                if batch.name != LATEST_LOG:
+                    continue
+                if batch.restart:
+                    self.index.remove(batch.name)
+                await asyncio.to_thread(self.index.add, batch.name, batch.start, batch.lines)
 
     @app_commands.command(name="check_logs", description="Get player detailed logs.")
     @app_commands.checks.has_role(996679867334660192)
     async def logs_command(self, interaction, player: str):
-        player: PlayerData = get(self.players, uuid=player)
+        player: PlayerData = self.bot.snapshot.by_uuid.get(player)
         if not player:
             return await interaction.response.send_message("Player not found.")
-        player_logs = []
-        for log in self.logs:
-            if player.name in "\n".join(log["lines"]):
-                player_logs.append(log)
-        log_file = ""
-        for log in player_logs:
-            log_file += "\n" + ("#" * 15 + "\n") * 2
-            log_file += "#{} Log: {} | {}\n".format(log["index"], log["name"], log["date"])
-            log_file += ("#" * 15 + "\n") * 2 + "\n"
-            for line in log["lines"]:
-                if player.name in line:
-                    log_file += line + "\n"
-        await interaction.response.send_message(
+        await interaction.response.defer(ephemeral=True)
+        store = self.bot.log_store
+        matches = await asyncio.to_thread(store.lookup, player.name, player.uuid)
+        async with self.index_lock:
+            matches.update(self.index.lookup(player.name, player.uuid))
+        logs = {name: log for name in matches if (log := store.logs.get(name))}
+        log_file = BytesIO()
+        for name, log in sorted(logs.items(), key=lambda x: (x[1]["date"], x[1]["index"])):
+            log_file.write(b"\n" + (b"#" * 15 + b"\n") * 2)
+            log_file.write("#{} Log: {} | {}\n".format(log["index"], name, log["date"]).encode())
+            log_file.write((b"#" * 15 + b"\n") * 2 + b"\n")
+            for line in await asyncio.to_thread(store.read, name, matches[name]):
+                log_file.write(line.encode() + b"\n")
+        log_file.seek(0)
+        await interaction.followup.send(
             content="Here's the logs for {}:".format(player.name),
-            file=File(BytesIO(log_file.encode()), filename="test.log"),
+            file=File(log_file, filename="test.log"),
             ephemeral=True,
         )
 
     @logs_command.autocomplete("player")
     async def logs_command_autocomplete(self, interaction, current: str):
         """Autocomplete for the player command."""
-        players = list(filter(lambda x: x.name.lower().startswith(current.lower()), self.players))
-        return [app_commands.Choice(name=player.name, value=player.uuid) for player in players][:25]
+        players = self.bot.player_names.search(current)
+        return [app_commands.Choice(name=name, value=uuid) for name, uuid in players]
 
 
 async def setup(bot):
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+from discord.ext import commands, tasks
+from utils.database.models import DailyStatSample, HourlyStatSample, StatSample, StatSeries
+from utils.objects import PlayerData, PlayerDelta
+
+TRACKED = (
+    "belly",
+    "bounty",
+    "loyalty",
+    "doriki",
+    "harderning_haki",
+    "imbuing_haki",
+    "observation_haki",
+    "mob_kills",
+)
+# Each series is rolled up into the next, coarser one
+ROLLUPS = [(StatSample, HourlyStatSample, "hour"), (HourlyStatSample, DailyStatSample, "day")]
+BUCKETS = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+
+class History(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.last_values: Optional[dict[str, dict]] = None
+
+    async def cog_load(self):
+        self.roll_up_history.start()
+
+    async def cog_unload(self):
+        self.roll_up_history.cancel()
+
+    @staticmethod
+    def tracked_values(player: PlayerData) -> dict:
+        values = {field: getattr(player, field) for field in TRACKED}
+        values["mob_kills"] = sum(player.mob_kills.values())
+        return values
+
+    async def load_last_values(self) -> dict[str, dict]:
+        """The values of the latest stat sample of every player."""
+        pipeline = [
+            {"$sort": {"timestamp": 1}},
+            {"$group": {"_id": "$uuid", **{field: {"$last": f"${field}"} for field in TRACKED}}},
+        ]
+        return {sample.pop("_id"): sample for sample in await StatSample.aggregate(pipeline).to_list()}
+
+    @commands.Cog.listener("on_player_data_delta")
+    async def record_history(self, delta: PlayerDelta):
+        """Writes a stat sample for every player whose tracked stats changed since their last sample."""
+        if self.last_values is None:
+            self.last_values = await self.load_last_values()
+        now = datetime.utcnow()
+        samples = []
+        for player in delta.updated(*TRACKED):
+            values = self.tracked_values(player)
+            if self.last_values.get(player.uuid) != values:
+                self.last_values[player.uuid] = values
+                samples.append(StatSample(timestamp=now, uuid=player.uuid, **values))
+        if samples:
+            await StatSample.insert_many(samples)
+
+    async def roll_up(self, source: type[StatSeries], target: type[StatSeries], unit: str):
+        """Keeps the last sample of every complete bucket of a series that wasn't rolled up yet."""
+        end = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        if unit == "day":
+            end = end.replace(hour=0)
+        window = {"$lt": end}
+        if latest := await target.find_all().sort("-timestamp").first_or_none():
+            window["$gte"] = latest.timestamp + BUCKETS[unit]
+        pipeline = [
+            {"$match": {"timestamp": window}},
+            {"$sort": {"timestamp": 1}},
+            {
+                "$group": {
+                    "_id": {"uuid": "$uuid", "timestamp": {"$dateTrunc": {"date": "$timestamp", "unit": unit}}},
+                    **{field: {"$last": f"${field}"} for field in TRACKED},
+                }
+            },
+        ]
+        buckets = await source.aggregate(pipeline).to_list()
+        if buckets:
+            await target.insert_many([target(**bucket.pop("_id"), **bucket) for bucket in buckets])
+
+    @tasks.loop(hours=1)
+    async def roll_up_history(self):
+        """Rolls the stat samples up into hourly and daily series every hour."""
+        await self.bot.modules_ready.wait()
+        for source, target, unit in ROLLUPS:
+            await self.roll_up(source, target, unit)
+
+
+async def setup(bot):
+    await bot.add_cog(History(bot))
@@ -3,15 +3,43 @@ from io import BytesIO
 from random import randint
 from uuid import UUID
 
-import matplotlib.pyplot as plt
 from discord import ButtonStyle, Embed, File, app_commands
 from discord.ext import commands
 from discord.ui import Modal, TextInput, View, button
-from discord.utils import get
-from mcrcon import MCRcon, MCRconException
+from utils.charts import ChartRenderer, population_chart
 from utils.database.models import Players as PlayersDB
+from utils.functions import rcon_client
 from utils.objects import Factions, FightingStyles, Races, PlayerData
 
+# Population charts by kind, as (player field, members, labels, colors)
+POPULATIONS = {
+    "factions": (
+        "faction",
+        [Factions.Pirate, Factions.Marine, Factions.Revolutionary, Factions.BountyHunter],
+        ["Pirates", "Marines", "Revolutionaries", "Bounty hunters"],
+        ["#6b0700", "#00276b", "#8a2801", "#256b00"],
+    ),
+    "fighting_styles": (
+        "fighting_style",
+        [
+            FightingStyles.Swordsman,
+            FightingStyles.Sniper,
+            FightingStyles.Doctor,
+            FightingStyles.Brawler,
+            FightingStyles.BlackLeg,
+            FightingStyles.ArtofWeather,
+        ],
+        ["Swordsman", "Sniper", "Doctor", "Brawler", "Black Leg", "Art of Weather"],
+        None,
+    ),
+    "races": (
+        "race",
+        [Races.Human, Races.Cyborg, Races.Mink, Races.Fishman],
+        ["Human", "Cyborg", "Mink", "Fishman"],
+        None,
+    ),
+}
+
 
 class InsertCodeModal(Modal, title="Code Input"):
     sent_code = TextInput(
@@ -71,30 +99,28 @@ class CodeButton(View):
 class Players(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.players = []
+        self.charts = ChartRenderer()
 
     @commands.Cog.listener("on_player_data")
-    async def update_player_data(self, player_data: list[PlayerData]):
-        """Updates the devil fruit circulation."""
+    async def update_nicknames(self, players: list[PlayerData]):
+        """Syncs the nickname of every linked member, queueing only the ones that don't match."""
         await self.bot.modules_ready.wait()
-        self.players = player_data
         guild = self.bot.get_guild(self.bot.config.discord_server_id)
         if not guild:
             return
-        for player in player_data:
-            member = guild.get_member(player.discord_id)
-            if not member:
+        for player in players:
+            if player.discord_id is None:
+                continue
+            member = await self.bot.members.get(guild, player.discord_id)
+            if not member or self.bot.nicknames.on_cooldown(member.id):
                 continue
             if member.display_name != player.name:
-                try:
-                    await member.edit(nick=player.name)
-                except:
-                    pass
+                self.bot.nicknames.queue(member, player.name)
 
     @app_commands.command(name="check_player", description="Get player detailed data.")
     async def get_player(self, interaction, *, player: str):
         """Gets a player's data."""
-        player: PlayerData = get(self.players, uuid=player)
+        player: PlayerData = self.bot.snapshot.by_uuid.get(player)
         embed = Embed(title=player.name)
         embed.add_field(name="Race", value=getattr(player.race, "name", "Not Selected"))
         embed.add_field(
@@ -134,13 +160,13 @@ class Players(commands.Cog):
     @get_player.autocomplete("player")
     async def get_player_autocomplete(self, ctx, current: str):
         """Autocomplete for the player command."""
-        players = list(filter(lambda x: x.name.lower().startswith(current.lower()), self.players))
-        return [app_commands.Choice(name=player.name, value=player.uuid) for player in players][:25]
+        players = self.bot.player_names.search(current)
+        return [app_commands.Choice(name=name, value=uuid) for name, uuid in players]
 
     @app_commands.command(name="check_mob_kills", description="Get player mob kills.")
     async def get_mob_kills(self, interaction, *, player: str):
         """Gets a player's mob kills."""
-        player: PlayerData = get(self.players, uuid=player)
+        player: PlayerData = self.bot.snapshot.by_uuid.get(player)
         embed = Embed(title=player.name, description="```\n")
         if items := sorted(player.mob_kills.items(), key=lambda x: x[1], reverse=True):
             for mob, count in items:
@@ -155,8 +181,8 @@ class Players(commands.Cog):
     @get_mob_kills.autocomplete("player")
     async def get_mob_kills_autocomplete(self, ctx, current: str):
         """Autocomplete for the player command."""
-        players = list(filter(lambda x: x.name.lower().startswith(current.lower()), self.players))
-        return [app_commands.Choice(name=player.name, value=player.uuid) for player in players][:25]
+        players = self.bot.player_names.search(current)
+        return [app_commands.Choice(name=name, value=uuid) for name, uuid in players]
 
     @app_commands.command(name="inactive_players", description="Get inactive players.")
     async def get_inactive_players(self, interaction, fruit: bool = False):
@@ -164,7 +190,7 @@ class Players(commands.Cog):
         now = datetime.utcnow()
         embed = Embed(title="Inactive Players")
         embed.description = "```\n"
-        for player in self.players:
+        for player in self.bot.snapshot:
             if now > player.last_seen + timedelta(days=3):
                 if fruit and not player.devil_fruits:
                     continue
@@ -172,79 +198,29 @@ class Players(commands.Cog):
         embed.description += "```"
         await interaction.response.send_message(embed=embed)
 
+    async def send_population(self, interaction, kind: str):
+        # Rendering can take longer than the interaction allows on the first request of a snapshot
+        await interaction.response.defer()
+        field, members, labels, colors = POPULATIONS[kind]
+        players = self.bot.snapshot
+        image = await self.charts.render(
+            kind, players.generation, population_chart, players.players, field, members, labels, colors
+        )
+        await interaction.followup.send(file=File(BytesIO(image), filename=f"{kind}.png"))
+
     @app_commands.command(name="factions_population", description="Shows population distribution across factions.")
     async def get_factions_population(self, interaction):
-        pirates = [p for p in self.players if p.faction == Factions.Pirate]
-        marines = [p for p in self.players if p.faction == Factions.Marine]
-        revolut = [p for p in self.players if p.faction == Factions.Revolutionary]
-        bounthr = [p for p in self.players if p.faction == Factions.BountyHunter]
-        populations = [len(pirates), len(marines), len(revolut), len(bounthr)]
-        labels = ["Pirates", "Marines", "Revolutionaries", "Bounty hunters"]
-        colors = ["#6b0700", "#00276b", "#8a2801", "#256b00"]
-        _, ax1 = plt.subplots()
-        _, texts, autotexts = ax1.pie(populations, colors=colors, labels=labels, autopct="%1.1f%%", startangle=90)
-        for text in texts:
-            text.set_color("#ccc")
-        for autotext in autotexts:
-            autotext.set_color("#ccc")
-        centre_circle = plt.Circle((0, 0), 0.70, fc="#0000")
-        fig = plt.gcf()
-        fig.gca().add_artist(centre_circle)
-        ax1.axis("equal")
-        image = BytesIO()
-        plt.savefig(image, facecolor="#0000", format="PNG")
-        image.seek(0)
-        await interaction.response.send_message(file=File(image, filename="factions.png"))
+        await self.send_population(interaction, "factions")
 
     @app_commands.command(
         name="fighting_styles_population", description="Shows population distribution across fighting styles."
     )
     async def get_fighting_styles_population(self, interaction):
-        swordsman = [p for p in self.players if p.fighting_style == FightingStyles.Swordsman]
-        sniper = [p for p in self.players if p.fighting_style == FightingStyles.Sniper]
-        doctor = [p for p in self.players if p.fighting_style == FightingStyles.Doctor]
-        brawler = [p for p in self.players if p.fighting_style == FightingStyles.Brawler]
-        blackleg = [p for p in self.players if p.fighting_style == FightingStyles.BlackLeg]
-        artofweather = [p for p in self.players if p.fighting_style == FightingStyles.ArtofWeather]
-        populations = [len(swordsman), len(sniper), len(doctor), len(brawler), len(blackleg), len(artofweather)]
-        labels = ["Swordsman", "Sniper", "Doctor", "Brawler", "Black Leg", "Art of Weather"]
-        _, ax1 = plt.subplots()
-        _, texts, autotexts = ax1.pie(populations, labels=labels, autopct="%1.1f%%", startangle=90)
-        for text in texts:
-            text.set_color("#ccc")
-        for autotext in autotexts:
-            autotext.set_color("#ccc")
-        centre_circle = plt.Circle((0, 0), 0.70, fc="#0000")
-        fig = plt.gcf()
-        fig.gca().add_artist(centre_circle)
-        ax1.axis("equal")
-        image = BytesIO()
-        plt.savefig(image, facecolor="#0000", format="PNG")
-        image.seek(0)
-        await interaction.response.send_message(file=File(image, filename="fighting_styles.png"))
+        await self.send_population(interaction, "fighting_styles")
 
     @app_commands.command(name="races_population", description="Shows population distribution across races.")
-    async def get_fighting_styles_population(self, interaction):
-        human = [p for p in self.players if p.race == Races.Human]
-        cyborg = [p for p in self.players if p.race == Races.Cyborg]
-        mink = [p for p in self.players if p.race == Races.Mink]
-        fishman = [p for p in self.players if p.race == Races.Fishman]
-        populations = [len(human), len(cyborg), len(mink), len(fishman)]
-        labels = ["Human", "Cyborg", "Mink", "Fishman"]
-        _, ax1 = plt.subplots()
-        _, texts, autotexts = ax1.pie(populations, labels=labels, autopct="%1.1f%%", startangle=90)
-        for text in texts:
-            text.set_color("#ccc")
-        for autotext in autotexts:
-            autotext.set_color("#ccc")
-        centre_circle = plt.Circle((0, 0), 0.70, fc="#0000")
-        fig = plt.gcf()
-        fig.gca().add_artist(centre_circle)
-        ax1.axis("equal")
-        image = BytesIO()
-        plt.savefig(image, facecolor="#0000", format="PNG")
-        image.seek(0)
-        await interaction.response.send_message(file=File(image, filename="races.png"))
+    async def get_races_population(self, interaction):
+        await self.send_population(interaction, "races")
 
     @app_commands.command(name="link_player", description="Link a player to a discord account.")
     async def link_player(self, interaction, *, player: str):
@@ -255,10 +231,10 @@ class Players(commands.Cog):
                 return await interaction.response.send_message("Please provide a valid username.")
             player = await p.json()
             player = (player["name"], str(UUID(player["id"])), interaction.user)
+        from mcrcon import MCRconException
+
         code = randint(1000, 9999)
-        with MCRcon(
-            host=self.bot.config.rcon_ip, password=self.bot.config.rcon_password, port=self.bot.config.rcon_port
-        ) as rcon:
+        with rcon_client(self.bot.config) as rcon:
             try:
                 rcon.command(f"/msg {player[0]} Your Discord link code: {code}")
             except MCRconException:
@@ -272,8 +248,8 @@ class Players(commands.Cog):
     @link_player.autocomplete("player")
     async def link_player_autocomplete(self, ctx, current: str):
         """Autocomplete for the player command."""
-        players = list(filter(lambda x: x.name.lower().startswith(current.lower()), self.players))
-        return [app_commands.Choice(name=player.name, value=player.name) for player in players][:25]
+        players = self.bot.player_names.search(current)
+        return [app_commands.Choice(name=name, value=name) for name, uuid in players]
 
 
 async def setup(bot):
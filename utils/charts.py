@@ -0,0 +1,47 @@
+import asyncio
+from collections import Counter
+from io import BytesIO
+from typing import Callable, Optional
+
+
+def population_chart(
+    players, field: str, members: list, labels: list[str], colors: Optional[list[str]] = None
+) -> bytes:
+    """Renders the share of players in each member of an enum field as a PNG donut chart."""
+    from matplotlib.figure import Figure
+    from matplotlib.patches import Circle
+
+    counts = Counter(getattr(player, field) for player in players)
+    figure = Figure()
+    ax = figure.subplots()
+    _, texts, autotexts = ax.pie(
+        [counts[member] for member in members], colors=colors, labels=labels, autopct="%1.1f%%", startangle=90
+    )
+    for text in texts + autotexts:
+        text.set_color("#ccc")
+    ax.add_artist(Circle((0, 0), 0.70, fc="#0000"))
+    ax.axis("equal")
+    image = BytesIO()
+    figure.savefig(image, facecolor="#0000", format="PNG")
+    return image.getvalue()
+
+
+class ChartRenderer:
+    """Renders charts in a worker thread, keeping the PNG of each chart kind for one snapshot generation."""
+
+    def __init__(self):
+        self.charts: dict[str, tuple[int, asyncio.Task]] = {}
+
+    def render(self, kind: str, generation: int, draw: Callable[..., bytes], *args) -> asyncio.Task:
+        """The PNG bytes of a chart, only drawn once per generation even if requested while still rendering.
+
+        Cancelled or failed renders are drawn again on the next request.
+        """
+        cached = self.charts.get(kind)
+        if cached is None or cached[0] != generation or self._failed(cached[1]):
+            cached = self.charts[kind] = (generation, asyncio.create_task(asyncio.to_thread(draw, *args)))
+        return cached[1]
+
+    @staticmethod
+    def _failed(task: asyncio.Task) -> bool:
+        return task.done() and (task.cancelled() or task.exception() is not None)
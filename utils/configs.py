@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from pathlib import Path
+from typing import Literal
 
 
 class DevilFruitConfig(BaseModel):
@@ -14,6 +15,35 @@ class FTPConfig(BaseModel):
     username: str
     password: str
     port: int
+    pool_size: int = 4  # Long-lived connections kept open to the server
+    keepalive: int = 60  # Seconds a connection can idle before it's checked with NOOP
+    timeout: int = 30
+    acquire_timeout: int = 120  # Seconds to wait for a free pooled connection
+    transfers: int = 0  # Concurrent downloads, 0 uses pool_size
+    transfer_timeout: int = 60
+    retries: int = 2
+
+
+class IngestionConfig(BaseModel):
+    parse_workers: int = 0  # 0 uses every core
+
+
+class RoleSyncConfig(BaseModel):
+    rate: int = 5  # Role edits allowed every `per` seconds
+    per: float = 5.0
+    cooldown: int = 3600  # Seconds to leave a member alone after missing permissions to edit their roles
+
+
+class NicknameSyncConfig(BaseModel):
+    cooldown: int = 3600  # Seconds to leave a member alone after missing permissions to rename them
+
+
+class MemberCacheConfig(BaseModel):
+    policy: Literal["full", "linked"] = "full"  # "full" chunks every member, "linked" caches linked players and staff
+    staff: list[int] = []  # Member ids kept cached with the "linked" policy, next to the bot owners
+    size: int = 1000  # Other members fetched on demand kept at once
+    ttl: int = 600  # Seconds a member fetched on demand is kept
+
 
 class BotConfig(BaseModel):
     language: str
@@ -36,3 +66,7 @@ class BotConfig(BaseModel):
     link_role: int
     devil_fruits: DevilFruitConfig
     ftp: FTPConfig
+    ingestion: IngestionConfig = IngestionConfig()
+    role_sync: RoleSyncConfig = RoleSyncConfig()
+    nickname_sync: NicknameSyncConfig = NicknameSyncConfig()
+    member_cache: MemberCacheConfig = MemberCacheConfig()
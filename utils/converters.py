@@ -1,5 +1,7 @@
+from functools import lru_cache
 from uuid import UUID
 
+@lru_cache(maxsize=None)
 def get_uuid_from_parts(most: int, least: int) -> str:
     """Get a uuid from the parts."""
     return str(UUID(
@@ -1,7 +1,17 @@
 from datetime import datetime
 from typing import Optional
 
-from beanie import Document, Indexed, Insert, Replace, before_event, after_event, PydanticObjectId
+from beanie import (
+    Document,
+    Granularity,
+    Indexed,
+    Insert,
+    Replace,
+    TimeSeriesConfig,
+    before_event,
+    after_event,
+    PydanticObjectId,
+)
 from pydantic import BaseModel
 
 
@@ -32,3 +42,57 @@ class Users(Document):
     inventory: list = []
     economy: Economy = Economy()
     cooldowns: Cooldowns = Cooldowns()
+
+
+class StatSeries(Document):
+    """A player's tracked stats at a point in time, the base of every stat history collection."""
+
+    timestamp: datetime
+    uuid: str
+    belly: int
+    bounty: int
+    loyalty: int
+    doriki: int
+    harderning_haki: float
+    imbuing_haki: float
+    observation_haki: float
+    mob_kills: int
+
+
+class StatSample(StatSeries):
+    """Written every time one of a player's tracked stats changes, kept for a week."""
+
+    class Settings:
+        name = "stat_samples"
+        timeseries = TimeSeriesConfig(
+            time_field="timestamp",
+            meta_field="uuid",
+            granularity=Granularity.minutes,
+            expire_after_seconds=7 * 24 * 3600,
+        )
+
+
+class HourlyStatSample(StatSeries):
+    """The last stat sample of each hour a player changed, kept for 90 days."""
+
+    class Settings:
+        name = "stat_samples_hourly"
+        timeseries = TimeSeriesConfig(
+            time_field="timestamp",
+            meta_field="uuid",
+            granularity=Granularity.hours,
+            expire_after_seconds=90 * 24 * 3600,
+        )
+
+
+class DailyStatSample(StatSeries):
+    """The last stat sample of each day a player changed, kept for two years."""
+
+    class Settings:
+        name = "stat_samples_daily"
+        timeseries = TimeSeriesConfig(
+            time_field="timestamp",
+            meta_field="uuid",
+            granularity=Granularity.hours,
+            expire_after_seconds=730 * 24 * 3600,
+        )
@@ -1,15 +1,21 @@
 from datetime import datetime
 from io import BytesIO
 from pathlib import Path
-from typing import Iterable
+from typing import TYPE_CHECKING, Iterable
 import yaml
-from ftputil import FTPHost
-from nbt import nbt
-from nbt.nbt import TAG_Byte, TAG_Compound, TAG_Double, TAG_Float, TAG_Int, TAG_List, TAG_Long, TAG_String
+from beanie.operators import In
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 
 from utils.objects import MinecraftPlayer, Module
 from utils.database.models import Players
 
+if TYPE_CHECKING:
+    from ftputil import FTPHost
+    from mcrcon import MCRcon
+    from nbt import nbt
+    from utils.configs import BotConfig
+
 
 def chunks(l: Iterable, n: int) -> Iterable:
     """Yield successive n-sized chunks from list."""
@@ -17,8 +23,10 @@ def chunks(l: Iterable, n: int) -> Iterable:
         yield l[i : i + n]
 
 
-def convert_nbt_to_dict(data: nbt.NBTFile) -> dict:
+def convert_nbt_to_dict(data: "nbt.NBTFile") -> dict:
     """Convert nbt file to dict."""
+    from nbt.nbt import TAG_Byte, TAG_Compound, TAG_Double, TAG_Float, TAG_Int, TAG_List, TAG_Long, TAG_String
+
     if isinstance(data, (TAG_String, TAG_Int, TAG_Long, TAG_Byte, TAG_Float, TAG_Double)):
         return data.value
     as_dict = {}
@@ -48,19 +56,50 @@ def get_modules(path: Path) -> Iterable[Module]:
         yield Module(base_path=path.parent, path=module)
 
 
-async def get_mc_player(data: dict, player_id: str) -> MinecraftPlayer:
-    """Get a player from the api."""
-    player = await Players.find_one(Players.uuid == player_id)
-    if player is None:
-        player = Players(uuid=player_id, name=data[player_id], last_updated=int(datetime.utcnow().timestamp()))
-    player.name = data[player_id]
-    await player.save()
-    return MinecraftPlayer(
-        uuid=player.uuid, name=player.name, discord_id=player.discord_id, last_updated=player.last_updated
-    )
+async def get_mc_players(data: dict, player_ids: Iterable[str]) -> dict[str, MinecraftPlayer]:
+    """Get many players from the database at once, only writing back the ones that are new or renamed."""
+    player_ids = list(player_ids)
+    players = {player.uuid: player for player in await Players.find(In(Players.uuid, player_ids)).to_list()}
+    now = int(datetime.utcnow().timestamp())
+    writes = []
+    for player_id in player_ids:
+        player = players.get(player_id)
+        if player is None:
+            player = players[player_id] = Players(uuid=player_id, name=data[player_id], last_updated=now)
+        elif player.name == data[player_id]:
+            continue
+        player.name = data[player_id]
+        writes.append(
+            UpdateOne(
+                {"uuid": player_id},
+                {"$set": {"name": player.name}, "$setOnInsert": {"last_updated": now}},
+                upsert=True,
+            )
+        )
+    if writes:
+        try:
+            await Players.get_motor_collection().bulk_write(writes, ordered=False)
+        except BulkWriteError as e:
+            print(f"Failed to save {len(e.details['writeErrors'])} players: {e.details['writeErrors'][0]['errmsg']}")
+    return {
+        player_id: MinecraftPlayer(
+            uuid=player_id,
+            name=players[player_id].name,
+            discord_id=players[player_id].discord_id,
+            last_updated=players[player_id].last_updated,
+        )
+        for player_id in player_ids
+    }
+
+
+def rcon_client(config: "BotConfig") -> "MCRcon":
+    """A connection to the server's rcon, mcrcon is only imported once it's first needed."""
+    from mcrcon import MCRcon
+
+    return MCRcon(host=config.rcon_ip, password=config.rcon_password, port=config.rcon_port)
 
 
-def read_ftp_file(server: FTPHost, path: Path):
+def read_ftp_file(server: "FTPHost", path: Path):
     """Read a file from the ftp server."""
     if not server.path.exists(path):
         raise Exception(f"File {path} does not exist in the Server.")
@@ -0,0 +1,296 @@
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import zlib
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Optional
+
+from utils.logs import LATEST_LOG, TOKEN, LogBatch
+
+BLOCK_LINES = 1024
+LINE_TIME = re.compile(r"\[(\d{2}:\d{2}:\d{2})\]")
+# Postings files: token count, then per sorted token its byte offset and length and those of its line offsets
+POSTINGS_HEADER = struct.Struct("<I")
+POSTINGS_ENTRY = struct.Struct("<IIII")
+# Block index files: per block its byte offset and length in the segment, its first line offset and that line's time
+BLOCK_ENTRY = struct.Struct("<QII8s")
+OPEN_MAPS = 16  # Memory maps kept open at once, each holds a file descriptor
+
+
+class MapCache:
+    """Least recently used read only memory maps, closed once evicted so open file descriptors stay bounded."""
+
+    def __init__(self, size: int = OPEN_MAPS):
+        self.size = size
+        self.maps: OrderedDict[Path, tuple[int, mmap.mmap]] = OrderedDict()
+
+    def get(self, path: Path, size: int = 0) -> mmap.mmap:
+        """The first size bytes of a file mapped, the whole file when size is 0."""
+        cached = self.maps.get(path)
+        if cached is not None and cached[0] == size:
+            self.maps.move_to_end(path)
+            return cached[1]
+        self.pop(path)
+        with path.open("rb") as mapped_file:
+            data = mmap.mmap(mapped_file.fileno(), size, access=mmap.ACCESS_READ)
+        self.maps[path] = (size, data)
+        while len(self.maps) > self.size:
+            self.maps.popitem(last=False)[1][1].close()
+        return data
+
+    def pop(self, path: Path):
+        if cached := self.maps.pop(path, None):
+            cached[1].close()
+
+    def close(self):
+        for _, data in self.maps.values():
+            data.close()
+        self.maps.clear()
+
+
+class LogStore:
+    """Ingested log lines in append only, zlib compressed segment files, read back through mmap a block at a time.
+
+    Rotated logs are sealed once stored, their postings are saved next to the segment and searched through mmap.
+    Each segment has its block index in a file of its own, only read along with the segment.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.path.mkdir(parents=True, exist_ok=True)
+        # Sealed logs, only rewritten when a rotated log is stored or dropped
+        self.index_path = path.joinpath("index.json")
+        # The ingester state and latest.log, rewritten on every append
+        self.latest_path = path.joinpath("latest.json")
+        self.lock = threading.Lock()
+        self.maps = MapCache()
+        self.postings_maps = MapCache()
+        # name: {date, index, lines, size, blocks: number of entries in its block index file}
+        self.logs: dict[str, dict] = {}
+        self.ingester_state: Optional[dict] = None
+        logs = json.loads(self.index_path.read_text()) if self.index_path.exists() else {}
+        if self.latest_path.exists():
+            latest = json.loads(self.latest_path.read_text())
+            self.ingester_state = latest["ingester"]
+            if latest["log"] is not None:
+                logs[LATEST_LOG] = latest["log"]
+        lost = []
+        for name, log in logs.items():
+            log["date"] = datetime.fromisoformat(log["date"])
+            if self._restore(name, log):
+                self.logs[name] = log
+            else:
+                lost.append(name)
+        if lost:
+            self._forget(lost)
+
+    def segment(self, name: str) -> Path:
+        return self.path.joinpath(f"{name}.seg")
+
+    def block_index(self, name: str) -> Path:
+        return self.path.joinpath(f"{name}.blk")
+
+    def postings(self, name: str) -> Path:
+        return self.path.joinpath(f"{name}.tok")
+
+    def append(self, batches: list[LogBatch], ingester_state: dict) -> list[LogBatch]:
+        """Writes batches to their segments and saves the indexes along with the ingester state.
+
+        Returns the batches with the offset of their first line in the log.
+        """
+        stored = []
+        sealed = False
+        with self.lock:
+            for batch in batches:
+                log = self.logs.get(batch.name)
+                # Rotated logs come whole, one ingested again after a crash replaces what was stored
+                if log is None or batch.restart or batch.name != LATEST_LOG:
+                    self._drop(batch.name)
+                    log = self.logs[batch.name] = {
+                        "date": batch.date,
+                        "index": batch.index,
+                        "lines": 0,
+                        "size": 0,
+                        "blocks": 0,
+                    }
+                stored.append(batch._replace(start=log["lines"]))
+                with self.segment(batch.name).open("ab") as segment, self.block_index(batch.name).open("ab") as blocks:
+                    for i in range(0, len(batch.lines), BLOCK_LINES):
+                        lines = batch.lines[i : i + BLOCK_LINES]
+                        block = zlib.compress("\n".join(lines).encode())
+                        segment.write(block)
+                        time = LINE_TIME.match(lines[0])
+                        time = time.group(1).encode() if time else b""
+                        blocks.write(BLOCK_ENTRY.pack(log["size"], len(block), log["lines"], time))
+                        log["size"] += len(block)
+                        log["lines"] += len(lines)
+                        log["blocks"] += 1
+                if batch.name != LATEST_LOG:
+                    self._write_postings(batch.name, batch.lines)
+                    sealed = True
+            self.ingester_state = ingester_state
+            if sealed:
+                self._save_sealed()
+            self._save_latest()
+        return stored
+
+    def read(self, name: str, offsets: Iterable[int]) -> list[str]:
+        """The lines at the given sorted offsets of a log, only decompressing the blocks holding them."""
+        with self.lock:
+            return self._read(name, offsets)
+
+    def read_all(self, name: str) -> list[str]:
+        """Every line of a log."""
+        log = self.logs.get(name)
+        return self.read(name, range(log["lines"])) if log else []
+
+    def lookup(self, *tokens: str) -> dict[str, list[int]]:
+        """Sorted offsets of the lines containing any of the tokens, by sealed log."""
+        keys = [token.lower().encode() for token in tokens]
+        matches = {}
+        with self.lock:
+            for name in self.logs:
+                if name == LATEST_LOG:
+                    continue
+                data = self._postings_map(name)
+                found = [offsets for key in keys if (offsets := self._find(data, key)) is not None]
+                if found:
+                    matches[name] = list(found[0]) if len(found) == 1 else sorted(set().union(*found))
+        return matches
+
+    def _read(self, name: str, offsets: Iterable[int]) -> list[str]:
+        log = self.logs.get(name)
+        if log is None or not log["size"]:
+            return []
+        data = self.maps.get(self.segment(name), log["size"])
+        with self.block_index(name).open("rb") as block_index:
+            blocks = list(BLOCK_ENTRY.iter_unpack(block_index.read(BLOCK_ENTRY.size * log["blocks"])))
+        firsts = [block[2] for block in blocks]
+        lines, block_lines, current = [], [], None
+        for offset in offsets:
+            if offset >= log["lines"]:
+                break
+            number = bisect_right(firsts, offset) - 1
+            if number != current:
+                start, length, first, _ = blocks[number]
+                block_lines = zlib.decompress(data[start : start + length]).decode().split("\n")
+                current = number
+            lines.append(block_lines[offset - firsts[number]])
+        return lines
+
+    def _write_postings(self, name: str, lines: list[str]):
+        """Saves the offsets of the lines holding each token of a sealed log, tokens sorted for binary search."""
+        postings: dict[bytes, array] = {}
+        for offset, line in enumerate(lines):
+            for token in set(TOKEN.findall(line.lower())):
+                postings.setdefault(token.encode(), array("I")).append(offset)
+        tokens = sorted(postings)
+        table = [POSTINGS_HEADER.pack(len(tokens))]
+        token_start = POSTINGS_HEADER.size + POSTINGS_ENTRY.size * len(tokens)
+        offsets_start = token_start + sum(map(len, tokens))
+        for token in tokens:
+            offsets = postings[token]
+            table.append(POSTINGS_ENTRY.pack(token_start, len(token), offsets_start, len(offsets)))
+            token_start += len(token)
+            offsets_start += offsets.itemsize * len(offsets)
+        path = self.postings(name)
+        temporary = path.with_suffix(".part")
+        with temporary.open("wb") as postings_file:
+            postings_file.write(b"".join(table))
+            postings_file.write(b"".join(tokens))
+            for token in tokens:
+                postings[token].tofile(postings_file)
+        os.replace(temporary, path)
+
+    def _postings_map(self, name: str) -> mmap.mmap:
+        path = self.postings(name)
+        if not path.exists():
+            # Sealed logs stored before their postings were saved
+            self._write_postings(name, self._read(name, range(self.logs[name]["lines"])))
+        return self.postings_maps.get(path)
+
+    @staticmethod
+    def _find(data: mmap.mmap, token: bytes) -> Optional[array]:
+        """The line offsets of a token in a postings file, binary searching its sorted tokens."""
+        low, high = 0, POSTINGS_HEADER.unpack_from(data)[0]
+        while low < high:
+            middle = (low + high) // 2
+            entry = POSTINGS_HEADER.size + POSTINGS_ENTRY.size * middle
+            token_start, length, offsets_start, count = POSTINGS_ENTRY.unpack_from(data, entry)
+            key = data[token_start : token_start + length]
+            if key < token:
+                low = middle + 1
+            elif key > token:
+                high = middle
+            else:
+                offsets = array("I")
+                offsets.frombytes(data[offsets_start : offsets_start + offsets.itemsize * count])
+                return offsets
+        return None
+
+    def _restore(self, name: str, log: dict) -> bool:
+        """Cuts the files of a log back to what the index knows of, false when part of it is missing."""
+        files = [(self.segment(name), log["size"]), (self.block_index(name), BLOCK_ENTRY.size * log["blocks"])]
+        sizes = [path.stat().st_size if path.exists() else 0 for path, _ in files]
+        if any(size < expected for size, (_, expected) in zip(sizes, files)):
+            return False
+        for size, (path, expected) in zip(sizes, files):
+            if size > expected:
+                # Blocks written after the index was last saved are dropped
+                with path.open("r+b") as cut_file:
+                    cut_file.truncate(expected)
+        return True
+
+    def _drop(self, name: str):
+        self.maps.pop(self.segment(name))
+        self.postings_maps.pop(self.postings(name))
+        self.logs.pop(name, None)
+        self._unlink(name)
+
+    def _unlink(self, name: str):
+        for path in (self.segment(name), self.block_index(name), self.postings(name)):
+            path.unlink(missing_ok=True)
+
+    def _forget(self, names: list[str]):
+        """Drops logs whose files lost indexed blocks, so the ingester reads them from the raw logs again."""
+        for name in names:
+            print(f"The {name} log segment is incomplete, it will be ingested again.")
+            self._unlink(name)
+            if self.ingester_state is None:
+                continue
+            if name == LATEST_LOG:
+                self.ingester_state["latest"] = None
+            elif name in self.ingester_state["processed"]:
+                self.ingester_state["processed"].remove(name)
+        self._save_sealed()
+        self._save_latest()
+
+    @staticmethod
+    def _entry(log: dict) -> dict:
+        return dict(log, date=log["date"].isoformat())
+
+    @staticmethod
+    def _write_json(path: Path, value):
+        temporary = path.with_suffix(".part")
+        temporary.write_text(json.dumps(value))
+        os.replace(temporary, path)
+
+    def _save_sealed(self):
+        sealed = {name: self._entry(log) for name, log in self.logs.items() if name != LATEST_LOG}
+        self._write_json(self.index_path, sealed)
+
+    def _save_latest(self):
+        latest = self.logs.get(LATEST_LOG)
+        self._write_json(self.latest_path, {"ingester": self.ingester_state, "log": latest and self._entry(latest)})
+
+    def close(self):
+        with self.lock:
+            self.maps.close()
+            self.postings_maps.close()
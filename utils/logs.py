@@ -0,0 +1,138 @@
+import gzip
+import re
+import zlib
+from array import array
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+LATEST_LOG = "latest.log"
+ROTATED_LOG = re.compile(r"(\d{4}-\d{2}-\d{2})-(\d{1,2})\.log\.gz$")
+IP_ADDRESS = re.compile(r"\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}")
+# Uuids and anything shaped like a minecraft username
+TOKEN = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|[a-z0-9_]{3,16}")
+
+
+class LogBatch(NamedTuple):
+    """Lines of a log read since the last ingestion, on restart the lines read before are gone from the log."""
+
+    name: str
+    date: datetime
+    index: int
+    lines: list[str]
+    restart: bool = False
+    start: int = 0  # Offset of the first line in the log, set once stored
+
+
+def redact(lines: Iterable[str]) -> Iterator[str]:
+    """Strips the line endings and IP addresses of log lines, skipping empty lines."""
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line:
+            yield IP_ADDRESS.sub("*", line)
+
+
+class LogIngester:
+    """Reads server logs incrementally, each rotated log once and only the bytes appended to latest.log since."""
+
+    def __init__(self, path: Path, state: Optional[dict] = None):
+        self.path = path
+        self.processed: set[str] = set()
+        # (inode, offset of the first byte not read yet) of latest.log
+        self.latest: Optional[tuple[int, int]] = None
+        self.latest_date: Optional[datetime] = None
+        if state:
+            self.processed = set(state["processed"])
+            self.latest = tuple(state["latest"]) if state["latest"] else None
+            self.latest_date = datetime.fromisoformat(state["latest_date"]) if state["latest_date"] else None
+
+    def state(self) -> dict:
+        """What was read so far, to carry on from there after a restart."""
+        return {
+            "processed": sorted(self.processed),
+            "latest": self.latest,
+            "latest_date": self.latest_date and self.latest_date.isoformat(),
+        }
+
+    def ingest(self) -> list[LogBatch]:
+        """Reads the new rotated logs and the lines appended to latest.log, meant to run in a thread."""
+        batches = []
+        for log in sorted(self.path.glob("*.log.gz")):
+            match = ROTATED_LOG.match(log.name)
+            if match is None or log.name in self.processed:
+                continue
+            try:
+                with gzip.open(log, "rt", encoding="utf-8", errors="replace") as log_file:
+                    lines = list(redact(log_file))
+            except (EOFError, OSError, zlib.error) as e:
+                # Truncated or still being written, retried on the next run
+                print(f"Couldn't read {log.name}: {e}")
+                continue
+            date = datetime.strptime(match.group(1), "%Y-%m-%d")
+            batches.append(LogBatch(log.name, date, int(match.group(2)), lines))
+            self.processed.add(log.name)
+        if batch := self.tail_latest():
+            batches.append(batch)
+        return batches
+
+    def tail_latest(self) -> Optional[LogBatch]:
+        """The complete lines appended to latest.log, starting over once the server rotated it."""
+        path = self.path.joinpath(LATEST_LOG)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        restart = self.latest is None or self.latest[0] != stat.st_ino or stat.st_size < self.latest[1]
+        offset = 0 if restart else self.latest[1]
+        if restart:
+            self.latest_date = datetime.utcnow()
+        with path.open("rb") as log_file:
+            log_file.seek(offset)
+            data = log_file.read(stat.st_size - offset)
+        # A partial last line is read again once it's complete
+        end = data.rfind(b"\n") + 1
+        self.latest = (stat.st_ino, offset + end)
+        if not end and not restart:
+            return None
+        lines = list(redact(data[:end].decode("utf-8", errors="replace").split("\n")))
+        return LogBatch(LATEST_LOG, self.latest_date, 0, lines, restart)
+
+
+class LogIndex:
+    """In memory inverted index from the player names and uuids in log lines to the offsets of those lines by log."""
+
+    def __init__(self):
+        self.postings: dict[str, dict[str, array]] = {}
+        self.tokens: dict[str, set[str]] = {}
+        self.indexed: dict[str, int] = {}
+
+    def add(self, log: str, start: int, lines: list[str]):
+        """Indexes lines appended to a log, the first one being at the given offset, skipping lines already indexed."""
+        log_tokens = self.tokens.setdefault(log, set())
+        indexed = self.indexed.get(log, 0)
+        skipped = max(indexed - start, 0)
+        self.indexed[log] = max(indexed, start + len(lines))
+        for offset, line in enumerate(lines[skipped:], start + skipped):
+            for token in set(TOKEN.findall(line.lower())):
+                self.postings.setdefault(token, {}).setdefault(log, array("I")).append(offset)
+                log_tokens.add(token)
+
+    def remove(self, log: str):
+        """Drops every line of a log from the index."""
+        self.indexed.pop(log, None)
+        for token in self.tokens.pop(log, ()):
+            logs = self.postings[token]
+            del logs[log]
+            if not logs:
+                del self.postings[token]
+
+    def lookup(self, *tokens: str) -> dict[str, list[int]]:
+        """Sorted offsets of the lines containing any of the tokens, by log."""
+        matches: dict[str, list[array]] = {}
+        for token in tokens:
+            for log, offsets in self.postings.get(token.lower(), {}).items():
+                matches.setdefault(log, []).append(offsets)
+        return {
+            log: list(offsets[0]) if len(offsets) == 1 else sorted(set().union(*offsets))
+            for log, offsets in matches.items()
+        }
@@ -0,0 +1,70 @@
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from discord import Guild, HTTPException, Member, NotFound
+
+from utils.configs import MemberCacheConfig
+from utils.functions import chunks
+
+
+class MemberCache:
+    """Keeps linked players and staff in the guild member cache, other members are fetched into a short lived LRU."""
+
+    def __init__(self, config: MemberCacheConfig):
+        self.config = config
+        self.recent: OrderedDict[int, tuple[float, Optional[Member]]] = OrderedDict()
+
+    @property
+    def linked_only(self) -> bool:
+        return self.config.policy == "linked"
+
+    def _recent(self, member_id: int) -> tuple[bool, Optional[Member]]:
+        cached = self.recent.get(member_id)
+        if cached is None or cached[0] < time.monotonic():
+            return False, None
+        self.recent.move_to_end(member_id)
+        return True, cached[1]
+
+    def _remember(self, member_id: int, member: Optional[Member]):
+        self.recent[member_id] = (time.monotonic() + self.config.ttl, member)
+        self.recent.move_to_end(member_id)
+        while len(self.recent) > self.config.size:
+            self.recent.popitem(last=False)
+
+    async def keep(self, guild: Guild, member_ids: Iterable[int]):
+        """Makes sure the given members are in the guild member cache, querying the gateway for missing ones."""
+        if not self.linked_only:
+            return
+        missing = [
+            member_id
+            for member_id in set(member_ids)
+            if guild.get_member(member_id) is None and not self._recent(member_id)[0]
+        ]
+        for member_ids in chunks(missing, 100):
+            try:
+                members = await guild.query_members(user_ids=member_ids, cache=True)
+            except TimeoutError:
+                continue
+            found = {member.id for member in members}
+            # Members that left are remembered so they aren't queried again every cycle
+            for member_id in member_ids:
+                if member_id not in found:
+                    self._remember(member_id, None)
+
+    async def get(self, guild: Guild, member_id: int) -> Optional[Member]:
+        """A member from the guild member cache, or fetched and kept for a while if the policy didn't cache them."""
+        member = guild.get_member(member_id)
+        if member is not None or not self.linked_only:
+            return member
+        found, member = self._recent(member_id)
+        if found:
+            return member
+        try:
+            member = await guild.fetch_member(member_id)
+        except NotFound:
+            member = None
+        except HTTPException:
+            return None
+        self._remember(member_id, member)
+        return member
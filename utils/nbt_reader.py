@@ -0,0 +1,161 @@
+import gzip
+from pathlib import Path
+from struct import Struct
+from typing import BinaryIO, Iterable, Optional, Union
+
+TAG_END = 0
+TAG_BYTE = 1
+TAG_SHORT = 2
+TAG_INT = 3
+TAG_LONG = 4
+TAG_FLOAT = 5
+TAG_DOUBLE = 6
+TAG_BYTE_ARRAY = 7
+TAG_STRING = 8
+TAG_LIST = 9
+TAG_COMPOUND = 10
+TAG_INT_ARRAY = 11
+TAG_LONG_ARRAY = 12
+
+_BYTE = Struct(">b")
+_UBYTE = Struct(">B")
+_SHORT = Struct(">h")
+_USHORT = Struct(">H")
+_INT = Struct(">i")
+_LONG = Struct(">q")
+_FLOAT = Struct(">f")
+_DOUBLE = Struct(">d")
+
+_SCALARS = {
+    TAG_BYTE: _BYTE,
+    TAG_SHORT: _SHORT,
+    TAG_INT: _INT,
+    TAG_LONG: _LONG,
+    TAG_FLOAT: _FLOAT,
+    TAG_DOUBLE: _DOUBLE,
+}
+_ARRAYS = {TAG_BYTE_ARRAY: (1, "b"), TAG_INT_ARRAY: (4, "i"), TAG_LONG_ARRAY: (8, "q")}
+
+WILDCARD = "*"
+
+
+class PathTree(dict):
+    """A trie of NBT paths, a node marked as full keeps its whole subtree."""
+
+    full = False
+
+    def child(self, key: str) -> Optional["PathTree"]:
+        node = self.get(key)
+        return self.get(WILDCARD) if node is None else node
+
+
+def compile_paths(paths: Iterable[str]) -> PathTree:
+    """Compile paths such as `ForgeCaps/mineminenomi:entity_stats/*` or `Inventory[*].id` into a trie.
+
+    Compound keys are separated by `/` and list elements are selected with `[*]` or a `*` segment,
+    a list without either applies the rest of the path to each element.
+    A path ending on a compound, list or `*` keeps everything under it.
+    """
+    root = PathTree()
+    for path in paths:
+        node = root
+        segments = path.replace("[*].", "/*/").replace("[*]", "/*").split("/")
+        for segment in filter(None, segments):
+            node = node.setdefault(segment, PathTree())
+        node.full = True
+    return root
+
+
+class _Reader:
+    def __init__(self, stream: BinaryIO):
+        self.read = stream.read
+
+    def unpack(self, struct: Struct):
+        return struct.unpack(self.read(struct.size))[0]
+
+    def skip(self, size: int):
+        while size > 0:
+            chunk = len(self.read(min(size, 65536)))
+            if not chunk:
+                raise EOFError("Unexpected end of NBT stream.")
+            size -= chunk
+
+    def string(self) -> str:
+        return self.read(self.unpack(_USHORT)).decode("utf-8", errors="replace")
+
+    def skip_string(self):
+        self.skip(self.unpack(_USHORT))
+
+    def payload(self, tag: int, node: Optional[PathTree]):
+        """Read a payload, only materialising what the path node selects."""
+        if tag in _SCALARS:
+            return self.unpack(_SCALARS[tag])
+        if tag == TAG_STRING:
+            return self.string()
+        if tag in _ARRAYS:
+            width, code = _ARRAYS[tag]
+            size = self.unpack(_INT)
+            return list(Struct(f">{size}{code}").unpack(self.read(size * width)))
+        if tag == TAG_LIST:
+            item_tag = self.unpack(_UBYTE)
+            size = self.unpack(_INT)
+            item_node = None if node is None or node.full else node.get(WILDCARD, node)
+            return [self.payload(item_tag, item_node) for _ in range(size)]
+        if tag == TAG_COMPOUND:
+            as_dict = {}
+            while (child_tag := self.unpack(_UBYTE)) != TAG_END:
+                key = self.string()
+                if node is None or node.full:
+                    as_dict[key] = self.payload(child_tag, None)
+                elif (child_node := node.child(key)) is not None:
+                    as_dict[key] = self.payload(child_tag, child_node)
+                else:
+                    self.skip_payload(child_tag)
+            return as_dict
+        raise ValueError(f"Unknown NBT tag {tag}.")
+
+    def skip_payload(self, tag: int):
+        """Skip a payload by its length without building it."""
+        if tag in _SCALARS:
+            self.skip(_SCALARS[tag].size)
+        elif tag == TAG_STRING:
+            self.skip_string()
+        elif tag in _ARRAYS:
+            self.skip(self.unpack(_INT) * _ARRAYS[tag][0])
+        elif tag == TAG_LIST:
+            item_tag = self.unpack(_UBYTE)
+            size = self.unpack(_INT)
+            if item_tag in _SCALARS:
+                self.skip(_SCALARS[item_tag].size * size)
+            else:
+                for _ in range(size):
+                    self.skip_payload(item_tag)
+        elif tag == TAG_COMPOUND:
+            while (child_tag := self.unpack(_UBYTE)) != TAG_END:
+                self.skip_string()
+                self.skip_payload(child_tag)
+        elif tag != TAG_END:
+            raise ValueError(f"Unknown NBT tag {tag}.")
+
+
+def read_nbt(stream: BinaryIO, paths: Union[PathTree, Iterable[str], None] = None) -> dict:
+    """Read a decompressed NBT stream into a dict, building only the requested paths.
+
+    Unlike `convert_nbt_to_dict`, shorts and arrays are kept instead of being turned into None.
+    """
+    if paths is not None and not isinstance(paths, PathTree):
+        paths = compile_paths(paths)
+    reader = _Reader(stream)
+    tag = reader.unpack(_UBYTE)
+    if tag != TAG_COMPOUND:
+        raise ValueError("NBT data does not start with a compound tag.")
+    reader.skip_string()
+    return reader.payload(tag, paths)
+
+
+def read_nbt_file(
+    source: Union[str, Path, BinaryIO], paths: Union[PathTree, Iterable[str], None] = None
+) -> dict:
+    """Read a gzipped NBT file (or file object) in one streaming pass."""
+    with gzip.open(source, "rb") as stream:
+        return read_nbt(stream, paths)
@@ -0,0 +1,59 @@
+import asyncio
+import time
+from collections import Counter
+
+from discord import Forbidden, Member
+
+from utils.configs import NicknameSyncConfig
+
+
+class NicknameSync:
+    """Applies member nicknames from a background queue, keeping only the latest nickname per member."""
+
+    def __init__(self, config: NicknameSyncConfig):
+        self.config = config
+        self.pending: dict[int, tuple[Member, str]] = {}
+        self.cooldowns: dict[int, float] = {}
+        self.counters = Counter(applied=0, skipped=0, failed=0)
+        self._wakeup = asyncio.Event()
+        self._worker = None
+
+    def on_cooldown(self, member_id: int) -> bool:
+        return self.cooldowns.get(member_id, 0) > time.monotonic()
+
+    def queue(self, member: Member, nick: str):
+        """Queues a nickname edit, replacing any edit still pending for that member."""
+        if self.on_cooldown(member.id):
+            self.counters["skipped"] += 1
+            return
+        self.pending[member.id] = (member, nick)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._drain())
+        self._wakeup.set()
+
+    async def _drain(self):
+        while True:
+            await self._wakeup.wait()
+            while self.pending:
+                member_id = next(iter(self.pending))
+                member, nick = self.pending.pop(member_id)
+                member = member.guild.get_member(member_id) or member
+                if member.display_name == nick or self.on_cooldown(member_id):
+                    self.counters["skipped"] += 1
+                    continue
+                try:
+                    await member.edit(nick=nick)
+                    self.counters["applied"] += 1
+                except Forbidden:
+                    self.cooldowns[member_id] = time.monotonic() + self.config.cooldown
+                    self.counters["failed"] += 1
+                except Exception as e:
+                    # Retried by the next reconcile since the nickname still won't match
+                    print(f"Failed to update the nickname of {member}: {e}")
+                    self.counters["failed"] += 1
+            self._wakeup.clear()
+
+    def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
@@ -1,7 +1,12 @@
 import asyncio
+import hashlib
+import json
 import os
-from datetime import datetime, timedelta
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
 from pathlib import Path
+from types import MappingProxyType
 from typing import Optional
 from enum import Enum
 
@@ -10,7 +15,7 @@ from pydantic import BaseModel, root_validator
 from json import load
 from utils.converters import get_uuid_from_parts
 from utils.configs import FTPConfig
-from aioftp import Client
+from aioftp import Client, StatusCodeError
 from io import BytesIO
 
 
@@ -18,28 +23,212 @@ class Object:
     ...
 
 
+class SyncManifest(BaseModel):
+    changed: list[Path] = []
+    failed: list[Path] = []
+
+
 class FTPServer:
+    # Errors after which a pooled connection can't be trusted anymore
+    CONNECTION_ERRORS = (OSError, EOFError, asyncio.TimeoutError)
+
     def __init__(self, ftp_config: FTPConfig):
         self.ftp = ftp_config
-
-    async def download_player_data(self, path):
+        # Idle (client, last used) pairs, the most recently used last
+        self._clients: list[tuple[Client, float]] = []
+        self._opened = 0
+        # Notified whenever a client is returned or a connection is closed, guards _clients and _opened
+        self._available = asyncio.Condition()
+        self._keepalive_task = None
+        self._synced = None
+
+    async def _connect(self) -> Client:
+        client = Client(socket_timeout=self.ftp.timeout)
+        try:
+            await client.connect(self.ftp.host, self.ftp.port)
+            await client.login(self.ftp.username, self.ftp.password)
+        except BaseException:
+            client.close()
+            raise
+        return client
+
+    async def _is_alive(self, client: Client) -> bool:
+        try:
+            await asyncio.wait_for(client.command("NOOP", "2xx"), self.ftp.timeout)
+            return True
+        except (*self.CONNECTION_ERRORS, StatusCodeError):
+            return False
+
+    async def _discard(self, client: Optional[Client]):
+        """Closes a connection, freeing its place in the pool for a waiting borrower."""
+        if client is not None:
+            client.close()
+        async with self._available:
+            self._opened -= 1
+            self._available.notify()
+
+    async def _release(self, client: Client):
+        async with self._available:
+            self._clients.append((client, time.monotonic()))
+            self._available.notify()
+
+    async def _acquire(self) -> Client:
+        if self._keepalive_task is None:
+            self._keepalive_task = asyncio.create_task(self._keepalive())
+        while True:
+            async with self._available:
+                await asyncio.wait_for(
+                    self._available.wait_for(lambda: self._clients or self._opened < self.ftp.pool_size),
+                    self.ftp.acquire_timeout,
+                )
+                if self._clients:
+                    client, last_used = self._clients.pop()
+                else:
+                    client, last_used = None, None
+                    self._opened += 1
+            if client is None:
+                try:
+                    return await self._connect()
+                except BaseException:
+                    await self._discard(None)
+                    raise
+            if time.monotonic() - last_used < self.ftp.keepalive or await self._is_alive(client):
+                return client
+            await self._discard(client)
+
+    @asynccontextmanager
+    async def connection(self):
+        """Borrows an authenticated client from the pool."""
+        client = await self._acquire()
+        try:
+            yield client
+        except StatusCodeError:
+            # The server refused the command, the connection itself is still usable
+            await self._release(client)
+            raise
+        except BaseException:
+            await self._discard(client)
+            raise
+        await self._release(client)
+
+    async def run(self, operation):
+        """Runs operation(client) on a pooled client, reconnecting once if the connection dropped."""
+        try:
+            async with self.connection() as client:
+                return await operation(client)
+        except self.CONNECTION_ERRORS:
+            async with self.connection() as client:
+                return await operation(client)
+
+    async def _keepalive(self):
+        """Sends NOOP on idle connections so the server doesn't drop them."""
+        while True:
+            await asyncio.sleep(self.ftp.keepalive)
+            async with self._available:
+                # Recently used clients stay available while the others are checked
+                now = time.monotonic()
+                idle = [entry for entry in self._clients if now - entry[1] >= self.ftp.keepalive]
+                self._clients = [entry for entry in self._clients if now - entry[1] < self.ftp.keepalive]
+            for client, _ in idle:
+                if await self._is_alive(client):
+                    await self._release(client)
+                else:
+                    await self._discard(client)
+
+    async def close(self):
+        """Closes every pooled connection."""
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            self._keepalive_task = None
+        async with self._available:
+            idle, self._clients = self._clients, []
+        for client, _ in idle:
+            await self._discard(client)
+
+    async def download_player_data(self, path) -> SyncManifest:
+        """Downloads player data files whose remote metadata changed, returning which cached files changed."""
         cache = Path("cache/player_data")
-        async with Client.context(self.ftp.host, self.ftp.port, self.ftp.username, self.ftp.password) as client:
-            for path, info in await client.list(path):
-                if info["type"] == "file" and path.suffix == ".dat":
-                    last_modified = datetime.strptime(info["modify"], "%Y%m%d%H%M%S")
-                    cached_file = cache.joinpath(path.name)
-                    if (
-                        not cached_file.exists()
-                        or last_modified > datetime.utcnow() - timedelta(minutes=10)
-                        or info["size"] != cached_file.stat().st_size
-                    ):
-                        await client.download(path, cached_file, write_into=True)
+        manifest_path = cache.joinpath("manifest.json")
+        if self._synced is None:
+            self._synced = await asyncio.to_thread(self._load_sync_manifest, manifest_path, cache)
+        listing = await self.run(lambda client: client.list(path))
+        stale = []
+        for path, info in listing:
+            if info["type"] == "file" and path.suffix == ".dat":
+                remote = {"size": int(info["size"]), "modify": info["modify"]}
+                synced = self._synced.get(str(path))
+                if synced is None or synced["size"] != remote["size"] or synced["modify"] != remote["modify"]:
+                    stale.append((path, cache.joinpath(path.name), remote))
+        manifest = SyncManifest()
+        transfers = asyncio.Semaphore(self.ftp.transfers or self.ftp.pool_size)
+
+        async def transfer(source: Path, cached_file: Path, remote: dict):
+            async with transfers:
+                if checksum := await self._download(source, cached_file, remote["modify"]):
+                    self._synced[str(source)] = {**remote, "checksum": checksum}
+                    manifest.changed.append(cached_file)
+                else:
+                    manifest.failed.append(cached_file)
+
+        await asyncio.gather(*(transfer(*file) for file in stale))
+        if stale:
+            await asyncio.to_thread(self._save_sync_manifest, manifest_path)
+        return manifest
+
+    def _load_sync_manifest(self, manifest_path: Path, cache: Path) -> dict:
+        """Loads the sync manifest, dropping entries whose cached file is missing or was altered."""
+        if not manifest_path.exists():
+            return {}
+        synced = json.load(manifest_path.open())
+        return {
+            remote_path: entry
+            for remote_path, entry in synced.items()
+            if self._checksum(cache.joinpath(Path(remote_path).name)) == entry["checksum"]
+        }
+
+    def _save_sync_manifest(self, manifest_path: Path):
+        partial = manifest_path.with_suffix(".part")
+        with partial.open("w") as f:
+            json.dump(self._synced, f)
+        os.replace(partial, manifest_path)
+
+    @staticmethod
+    def _checksum(path: Path) -> Optional[str]:
+        if not path.exists():
+            return None
+        return hashlib.blake2b(path.read_bytes(), digest_size=16).hexdigest()
+
+    async def _download(self, source: Path, destination: Path, modify: str) -> Optional[str]:
+        """Downloads a file through a temporary file, retrying failed or timed out transfers.
+
+        The cached file keeps the remote modify time, returns its checksum once in place.
+        """
+        partial = destination.with_suffix(".part")
+        modified = datetime.strptime(modify, "%Y%m%d%H%M%S").replace(tzinfo=timezone.utc).timestamp()
+        for attempt in range(1, self.ftp.retries + 2):
+            try:
+                async with self.connection() as client:
+                    await asyncio.wait_for(
+                        client.download(source, partial, write_into=True), self.ftp.transfer_timeout
+                    )
+                os.utime(partial, (modified, modified))
+                os.replace(partial, destination)
+                return self._checksum(destination)
+            except (*self.CONNECTION_ERRORS, StatusCodeError):
+                await asyncio.sleep(attempt)
+        partial.unlink(missing_ok=True)
+        return None
+
+    async def stat(self, path) -> dict:
+        """Returns the MLST facts (size, modify...) of a remote file."""
+        return await self.run(lambda client: client.stat(path))
 
     async def get_file(self, path):
-        async with Client.context(self.ftp.host, self.ftp.port, self.ftp.username, self.ftp.password) as client:
-            raw_data = await client.download_stream(path)
-            return await raw_data.read()
+        return await self.run(lambda client: self._get_file(client, path))
+
+    async def _get_file(self, client: Client, path) -> bytes:
+        async with client.download_stream(path) as stream:
+            return await stream.read()
 
 
 class Races(Enum):
@@ -76,6 +265,49 @@ class DevilFruit(BaseModel):
     format_name: str
     qualified_name: str
     rarity: str
+    position: int = 0
+
+    class Config:
+        frozen = True
+
+
+class FruitRegistry:
+    """Every devil fruit, loaded once and indexed by qualified name, item name and rarity."""
+
+    RARITIES = ["wooden_box", "iron_box", "golden_box"]
+
+    def __init__(self, data: dict):
+        fruits = sorted(
+            (
+                dict(rarity=rarity, qualified_name=qualified_name, **devil_fruit)
+                for rarity, rarity_fruits in data.items()
+                for fruit in rarity_fruits
+                for qualified_name, devil_fruit in fruit.items()
+            ),
+            key=lambda x: (self.RARITIES.index(x["rarity"]), x["format_name"]),
+        )
+        self.fruits = [DevilFruit(position=position, **fruit) for position, fruit in enumerate(fruits)]
+        self.by_qualified_name = {fruit.qualified_name: fruit for fruit in self.fruits}
+        self.by_name = {fruit.name: fruit for fruit in self.fruits}
+        self.by_rarity = {rarity: [] for rarity in self.RARITIES}
+        for fruit in self.fruits:
+            self.by_rarity[fruit.rarity].append(fruit)
+
+    @classmethod
+    def load(cls, path: Path = Path("resources/fruits.json")) -> "FruitRegistry":
+        return cls(load(path.open()))
+
+    def get(self, qualified_name: str) -> Optional[DevilFruit]:
+        return self.by_qualified_name.get(qualified_name)
+
+    def get_by_name(self, name: str) -> Optional[DevilFruit]:
+        return self.by_name.get(name)
+
+    def __iter__(self):
+        return iter(self.fruits)
+
+    def __len__(self) -> int:
+        return len(self.fruits)
 
 
 class PlayerData(BaseModel):
@@ -85,7 +317,8 @@ class PlayerData(BaseModel):
     sub_race: Optional[subRaces]
     faction: Optional[Factions]
     fighting_style: Optional[FightingStyles]
-    inventory: list[dict]
+    # Total count per item id, Tasks.load_inventory reads the full slots from the cached player file
+    inventory: dict[str, int]
     devil_fruits: list[DevilFruit]
     eaten_devil_fruits: list[DevilFruit]
     inventory_devil_fruits: list[DevilFruit]
@@ -103,6 +336,71 @@ class PlayerData(BaseModel):
     last_seen: datetime
     inactive: bool
 
+    @classmethod
+    def trusted(cls, **values) -> "PlayerData":
+        """Builds player data from values the ingestion pipeline already typed, skipping validation."""
+        for field in ("race", "sub_race", "faction", "fighting_style"):
+            if values[field] is not None:
+                values[field] = cls.__fields__[field].type_(values[field])
+        return cls.construct(**values)
+
+
+class PlayerChange(BaseModel):
+    player: PlayerData
+    previous: PlayerData
+    fields: set[str]
+
+
+class PlayerDelta(BaseModel):
+    players: list[PlayerData]
+    added: list[PlayerData] = []
+    removed: list[PlayerData] = []
+    changed: list[PlayerChange] = []
+
+    @classmethod
+    def between(cls, previous: list[PlayerData], players: list[PlayerData]) -> "PlayerDelta":
+        """Diffs two player data snapshots, players built from an unchanged file are the same object."""
+        previous = {player.uuid: player for player in previous}
+        delta = cls.construct(players=players, added=[], removed=[], changed=[])
+        for player in players:
+            old_player = previous.pop(player.uuid, None)
+            if old_player is None:
+                delta.added.append(player)
+            elif old_player is not player:
+                fields = {
+                    field for field in PlayerData.__fields__ if getattr(old_player, field) != getattr(player, field)
+                }
+                if fields:
+                    delta.changed.append(PlayerChange.construct(player=player, previous=old_player, fields=fields))
+        delta.removed.extend(previous.values())
+        return delta
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def updated(self, *fields: str) -> list[PlayerData]:
+        """Players that were added or had any of the given fields changed."""
+        return self.added + [change.player for change in self.changed if change.fields.intersection(fields)]
+
+
+class PlayerSnapshot:
+    """An immutable, generation numbered view of every player's data, swapped as a whole on each ingestion."""
+
+    def __init__(self, players: list[PlayerData], generation: int = 0):
+        self.generation = generation
+        self.players = tuple(players)
+        self.by_uuid = MappingProxyType({player.uuid: player for player in players})
+        self.by_discord_id = MappingProxyType(
+            {player.discord_id: player for player in players if player.discord_id is not None}
+        )
+        self.by_name = MappingProxyType({player.name: player for player in players})
+
+    def __iter__(self):
+        return iter(self.players)
+
+    def __len__(self) -> int:
+        return len(self.players)
+
 
 class CrewMember(BaseModel):
     username: str
@@ -116,13 +414,25 @@ class CrewMember(BaseModel):
         values["uuid"] = get_uuid_from_parts(values["idMost"], values["idLeast"])
         return values
 
+    @classmethod
+    def trusted(cls, **values) -> "CrewMember":
+        """Builds a crew member from its NBT compound, skipping validation."""
+        return cls.construct(
+            username=values["username"],
+            isCaptain=bool(values["isCaptain"]),
+            idMost=values["idMost"],
+            idLeast=values["idLeast"],
+            uuid=get_uuid_from_parts(values["idMost"], values["idLeast"]),
+        )
+
 
 class Crew(BaseModel):
     name: str
     members: list[CrewMember]
     jollyRoger: dict
+    captain_uuid: Optional[str] = None
 
-    @root_validator(pre=True)
+    @root_validator(skip_on_failure=True)
     def get_captain_uuid(cls, values: dict):
         for member in values["members"]:
             if member.isCaptain:
@@ -130,6 +440,17 @@ class Crew(BaseModel):
                 break
         return values
 
+    @classmethod
+    def trusted(cls, **values) -> "Crew":
+        """Builds a crew from its NBT compound, skipping validation."""
+        members = [CrewMember.trusted(**member) for member in values["members"]]
+        return cls.construct(
+            name=values["name"],
+            members=members,
+            jollyRoger=values["jollyRoger"],
+            captain_uuid=next((member.uuid for member in members if member.isCaptain), None),
+        )
+
 
 class MinecraftPlayer(BaseModel):
     uuid: str
@@ -0,0 +1,110 @@
+import re
+from collections import Counter
+from io import BytesIO
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from utils.converters import get_uuid_from_parts
+from utils.nbt_reader import compile_paths, read_nbt_file
+
+PLAYER_NBT_PATHS = compile_paths(
+    [
+        "UUIDMost",
+        "UUIDLeast",
+        "Inventory[*].id",
+        "Inventory[*].Count",
+        "ForgeCaps/mineminenomi:devil_fruit/devilFruit",
+        "ForgeCaps/mineminenomi:devil_fruit/hasYamiPower",
+        "ForgeCaps/mineminenomi:entity_stats/*",
+        "ForgeCaps/mineminenomi:haki_data/*",
+        "ForgeCaps/mineminenomi:ability_data/unlocked_abilities[*].name",
+    ]
+)
+INVENTORY_NBT_PATHS = compile_paths(["Inventory"])
+MINEMINENOMI_NBT_PATHS = compile_paths(["data/loggedoutFruits"])
+DEVIL_FRUIT_ITEM = re.compile(r"mineminenomi:([a-z_]+no_mi)")
+
+
+class PlayerRecord(NamedTuple):
+    """Compact, picklable result of parsing a player's .dat file."""
+
+    file_uuid: str
+    uuid: str
+    race: str
+    sub_race: str
+    faction: str
+    fighting_style: str
+    belly: int
+    bounty: int
+    loyalty: int
+    doriki: int
+    harderning_haki: float
+    imbuing_haki: float
+    observation_haki: float
+    haoshoku_haki: bool
+    devil_fruit: str
+    has_yami_power: bool
+    # Total count per item id, the full slots are loaded on demand with parse_inventory
+    inventory: tuple[tuple[str, int], ...]
+    inventory_devil_fruits: tuple[str, ...]
+    size: int
+    modified: float
+
+
+def parse_player_file(path: str) -> Optional[PlayerRecord]:
+    """Parse a cached player .dat file, meant to run in a worker process."""
+    path = Path(path)
+    stat = path.stat()
+    nbt_data = read_nbt_file(path, PLAYER_NBT_PATHS)
+    forgeCaps = nbt_data.get("ForgeCaps", {})
+    if not forgeCaps:
+        return None
+    devil_fruit = forgeCaps.get("mineminenomi:devil_fruit", {})
+    stats = forgeCaps["mineminenomi:entity_stats"]
+    haki_stats = forgeCaps["mineminenomi:haki_data"]
+    abilities = forgeCaps["mineminenomi:ability_data"]["unlocked_abilities"]
+    inventory = Counter()
+    inventory_devil_fruits = []
+    for item in nbt_data.get("Inventory", []):
+        inventory[item["id"]] += item.get("Count", 1)
+        if DEVIL_FRUIT_ITEM.match(item["id"]):
+            inventory_devil_fruits.append(item["id"].split(":")[1])
+    return PlayerRecord(
+        file_uuid=path.stem,
+        uuid=get_uuid_from_parts(nbt_data["UUIDMost"], nbt_data["UUIDLeast"]),
+        race=stats["race"],
+        sub_race=stats["subRace"],
+        faction=stats["faction"],
+        fighting_style=stats["fightingStyle"],
+        belly=stats["belly"],
+        bounty=stats["bounty"],
+        loyalty=stats["loyalty"],
+        doriki=stats["doriki"],
+        harderning_haki=haki_stats["busoHardeningHakiExp"],
+        imbuing_haki=haki_stats["busoImbuingHakiExp"],
+        observation_haki=haki_stats["kenHakiExp"],
+        haoshoku_haki=any(ability["name"] == "haoshoku_haki" for ability in abilities),
+        devil_fruit=devil_fruit.get("devilFruit", ""),
+        has_yami_power=bool(devil_fruit.get("hasYamiPower")),
+        inventory=tuple(inventory.items()),
+        inventory_devil_fruits=tuple(inventory_devil_fruits),
+        size=stat.st_size,
+        modified=stat.st_mtime,
+    )
+
+
+def parse_inventory(path: str) -> list[dict]:
+    """Parse every inventory slot of a cached player .dat file, with all of its tags."""
+    return read_nbt_file(Path(path), INVENTORY_NBT_PATHS).get("Inventory", [])
+
+
+def parse_logged_out_fruits(data: bytes) -> dict[str, tuple[int, tuple[str, ...]]]:
+    """Parse mineminenomi.dat into {uuid: (logout date in ms, fruit qualified names)}."""
+    nbt_data = read_nbt_file(BytesIO(data), MINEMINENOMI_NBT_PATHS)
+    return {
+        get_uuid_from_parts(inventory["uuidMost"], inventory["uuidLeast"]): (
+            inventory["date"],
+            tuple(inventory[f"fruit-{fruit_n}"] for fruit_n in range(inventory["fruits"])),
+        )
+        for inventory in nbt_data["data"]["loggedoutFruits"]
+    }
@@ -0,0 +1,82 @@
+import asyncio
+import time
+from collections import deque
+
+from discord import Forbidden, Member, Object
+
+from utils.configs import RoleSyncConfig
+
+
+class RoleReconciler:
+    """Merges the roles every source wants a member to have into a single, rate limited edit per member."""
+
+    def __init__(self, config: RoleSyncConfig):
+        self.config = config
+        self.managed: dict[str, set[int]] = {}
+        self.desired: dict[int, dict[str, set[int]]] = {}
+        self.pending: dict[int, Member] = {}
+        self.cooldowns: dict[int, float] = {}
+        self._wakeup = asyncio.Event()
+        self._edits = deque()
+        self._worker = None
+
+    def on_cooldown(self, member_id: int) -> bool:
+        return self.cooldowns.get(member_id, 0) > time.monotonic()
+
+    def register(self, source: str, role_ids):
+        """Declares the roles a source manages, a member only keeps the ones the source wants them to have."""
+        self.managed[source] = set(role_ids)
+
+    def target(self, member: Member) -> set[int]:
+        """The role ids a member should have according to every source."""
+        roles = {role.id for role in member.roles if not role.is_default()}
+        for source, role_ids in self.desired.get(member.id, {}).items():
+            roles -= self.managed.get(source, set())
+            roles |= role_ids
+        return roles
+
+    def set_roles(self, member: Member, source: str, role_ids):
+        """Sets the roles a source wants a member to have, queueing an edit if they don't match."""
+        self.desired.setdefault(member.id, {})[source] = set(role_ids)
+        if self.on_cooldown(member.id):
+            return
+        if self.target(member) != {role.id for role in member.roles if not role.is_default()}:
+            self.pending[member.id] = member
+            if self._worker is None or self._worker.done():
+                self._worker = asyncio.create_task(self._drain())
+            self._wakeup.set()
+
+    async def _throttle(self):
+        """Waits until another edit fits in the configured rate limit budget."""
+        if len(self._edits) >= self.config.rate:
+            elapsed = time.monotonic() - self._edits[0]
+            if elapsed < self.config.per:
+                await asyncio.sleep(self.config.per - elapsed)
+            self._edits.popleft()
+        self._edits.append(time.monotonic())
+
+    async def _drain(self):
+        while True:
+            await self._wakeup.wait()
+            while self.pending:
+                member_id = next(iter(self.pending))
+                member = self.pending.pop(member_id)
+                member = member.guild.get_member(member_id) or member
+                roles = self.target(member)
+                if self.on_cooldown(member_id) or roles == {role.id for role in member.roles if not role.is_default()}:
+                    continue
+                await self._throttle()
+                try:
+                    await member.edit(roles=[Object(id=role_id) for role_id in roles])
+                except Forbidden:
+                    self.cooldowns[member_id] = time.monotonic() + self.config.cooldown
+                    print(f"Missing permissions to update roles of {member}, retrying in {self.config.cooldown}s")
+                except Exception as e:
+                    # Anything else is retried on the next reconcile, the worker has to keep draining
+                    print(f"Failed to update roles of {member}: {e}")
+            self._wakeup.clear()
+
+    def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
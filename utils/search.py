@@ -0,0 +1,75 @@
+from bisect import bisect_left, insort
+from collections import Counter
+
+from utils.objects import PlayerDelta
+
+
+def trigrams(text: str) -> set[str]:
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class PlayerNameIndex:
+    """Case folded, sorted player names for prefix lookups, with a trigram index for typo tolerant matches."""
+
+    def __init__(self):
+        self.names: dict[str, str] = {}
+        self.sorted: list[tuple[str, str]] = []
+        self.trigrams: dict[str, set[str]] = {}
+
+    def add(self, uuid: str, name: str):
+        if uuid in self.names:
+            if self.names[uuid] == name:
+                return
+            self.remove(uuid)
+        folded = name.casefold()
+        self.names[uuid] = name
+        insort(self.sorted, (folded, uuid))
+        for trigram in trigrams(folded):
+            self.trigrams.setdefault(trigram, set()).add(uuid)
+
+    def remove(self, uuid: str):
+        name = self.names.pop(uuid, None)
+        if name is None:
+            return
+        folded = name.casefold()
+        del self.sorted[bisect_left(self.sorted, (folded, uuid))]
+        for trigram in trigrams(folded):
+            self.trigrams[trigram].discard(uuid)
+            if not self.trigrams[trigram]:
+                del self.trigrams[trigram]
+
+    def update(self, delta: PlayerDelta):
+        """Applies the players added, removed or renamed in a player data delta."""
+        for player in delta.removed:
+            self.remove(player.uuid)
+        for player in delta.updated("name"):
+            self.add(player.uuid, player.name)
+
+    def prefix(self, query: str, limit: int) -> list[str]:
+        """Uuids of the players whose name starts with the query, in name order."""
+        start = bisect_left(self.sorted, (query,))
+        matches = []
+        for folded, uuid in self.sorted[start : start + limit]:
+            if not folded.startswith(query):
+                break
+            matches.append(uuid)
+        return matches
+
+    def search(self, query: str, limit: int = 25) -> list[tuple[str, str]]:
+        """(name, uuid) of the best matches: prefix matches first, then substring and then similar names."""
+        query = query.casefold()
+        matches = self.prefix(query, limit)
+        query_trigrams = trigrams(query)
+        if len(matches) < limit and query_trigrams:
+            shared = Counter()
+            for trigram in query_trigrams:
+                shared.update(self.trigrams.get(trigram, ()))
+            found = set(matches)
+            candidates = [
+                (query not in self.names[uuid].casefold(), -count, self.names[uuid].casefold(), uuid)
+                for uuid, count in shared.items()
+                if uuid not in found and count * 3 >= len(query_trigrams)
+            ]
+            candidates.sort()
+            matches.extend(uuid for *_, uuid in candidates[: limit - len(matches)])
+        return [(self.names[uuid], uuid) for uuid in matches]
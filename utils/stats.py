@@ -0,0 +1,53 @@
+from typing import Optional, Sequence
+
+import numpy as np
+
+from utils.objects import Factions, PlayerData, Races
+
+
+class PlayerStatStore:
+    """Columnar NumPy copy of a player data snapshot, built once per snapshot to answer leaderboards."""
+
+    COLUMNS = {
+        "belly": np.int64,
+        "bounty": np.int64,
+        "loyalty": np.int64,
+        "doriki": np.int64,
+        "harderning_haki": np.float64,
+        "imbuing_haki": np.float64,
+        "observation_haki": np.float64,
+        "haoshoku_haki": np.bool_,
+        "haki_limit": np.float64,
+    }
+    # Enum columns are stored as their index, -1 when not selected
+    ENUMS = {"faction": list(Factions), "race": list(Races)}
+
+    def __init__(self, players: Sequence[PlayerData]):
+        self.size = len(players)
+        self.uuid = np.array([player.uuid for player in players], dtype=object)
+        self.name = np.array([player.name for player in players], dtype=object)
+        for column, dtype in self.COLUMNS.items():
+            setattr(self, column, np.fromiter((getattr(p, column) for p in players), dtype=dtype, count=self.size))
+        for column, members in self.ENUMS.items():
+            codes = {member: code for code, member in enumerate(members)}
+            values = (codes.get(getattr(player, column), -1) for player in players)
+            setattr(self, column, np.fromiter(values, dtype=np.int8, count=self.size))
+        self.last_seen = np.fromiter((p.last_seen.timestamp() for p in players), dtype=np.float64, count=self.size)
+
+    def code(self, column: str, member) -> int:
+        """The code an enum member is stored as in its column."""
+        return self.ENUMS[column].index(member)
+
+    def top(self, column: str, mask: Optional[np.ndarray] = None, k: Optional[int] = None) -> np.ndarray:
+        """Indices of the k highest values of a column among the masked rows, highest first."""
+        rows = np.flatnonzero(mask) if mask is not None else np.arange(self.size)
+        keys = -getattr(self, column)[rows].astype(np.float64)
+        if k is not None and k < rows.size:
+            selected = np.argpartition(keys, k - 1)[:k]
+            rows, keys = rows[selected], keys[selected]
+        return rows[np.argsort(keys, kind="stable")]
+
+    def leaderboard(self, column: str, mask: Optional[np.ndarray] = None, k: Optional[int] = None):
+        """(value, name) pairs of the k highest values of a column among the masked rows."""
+        rows = self.top(column, mask, k)
+        return list(zip(getattr(self, column)[rows].tolist(), self.name[rows].tolist()))